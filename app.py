@@ -1,50 +1,38 @@
 import os
 import pandas as pd
 import dash
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State, no_update
 import plotly.graph_objects as go
-import requests
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from flask import Response, jsonify, request
 import plotly.io as pio
 import time
+import uuid
+from functools import lru_cache
+from data.timeline import interval_timeline
+from data.figure_creator import state_bar_traces
+from data.normalize import overlapping_rows, frame_fingerprint
+from data.scheduler import RefreshScheduler
+from data.instrumentation import Instrumentation, count, stage
+from data.background import BackgroundJobs
+from data.analytics import ANALYSES, PARAMETERS
+from data.sites import WorkerPool, build_sites, sites_from_env
 
 
-pio.templates.default = "plotly_dark"
+load_dotenv()
 
 app = dash.Dash(__name__)
 server = app.server
-load_dotenv()
-
-load_dotenv()
-
-api_url = os.getenv('API_URL')
-authorization_token = os.getenv('AUTHORIZATION_TOKEN')
 
+instrumentation = Instrumentation.from_env()
+DEBUG_PANEL = os.getenv('DEBUG_PANEL', 'false').lower() in ('1', 'true', 'yes', 'on')
 
-headers = {
-    'Accept': 'application/json',
-    'Content-Type': 'application/json',
-    'Authorization': f'token {authorization_token}'
-}
+background_jobs = BackgroundJobs.from_env()
+BACKGROUND_WAIT_SECONDS = float(os.getenv('BACKGROUND_WAIT_SECONDS', '0.5'))
 
-
-def fetch_data():
-    try:
-        filter_query = '?fields=["tslast","tsactive","alarm","time_difference_minutes"]&limit=200000'
-        response = requests.get(f'{api_url}{filter_query}', headers=headers)
-        response.raise_for_status()  
-        return response.json().get('data', [])  
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data: {str(e)}")
-        return []
-
-
-def parse_frappe_api():
-    data = fetch_data()
-    df = pd.DataFrame(data)
-    print(f'Records fetched: {df.shape[0]}')  
-    return df.drop_duplicates() if not df.empty else pd.DataFrame()  
+FIGURE_CACHE_VERSION = 2
+LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', '15'))
 
 
 equipment_grouping = {
@@ -136,12 +124,16 @@ equipment_grouping = {
         'I79 - ONE OF THE OIL SUPPLY HAND VALVE 1,2,3 ARE NOT FULLY OPEN',
     ]}
 
+site_configs = sites_from_env()
+site_pool = WorkerPool.from_env(site_configs)
+sites = build_sites(site_configs, equipment_grouping, site_pool)
+default_site = next(iter(sites.values()))
 
-def map_to_equipment_group(alarm, equipment_grouping):
-    for equipment, alarms in equipment_grouping.items():
-        if alarm in alarms:
-            return equipment
-    return 'Unknown'
+# The first site's parts under their single-site names.
+alarm_store = default_site.store
+equipment_groups = default_site.grouping
+downtime_cube = default_site.cube
+figure_cache = default_site.figure_cache
 
 
 def minutes_to_hhmm(minutes):
@@ -158,100 +150,74 @@ def minutes_to_hhmm(minutes):
 
 
 
-def create_figure(selected_date,df):
-    start_date = f"{selected_date} 07:00:00"
-    end_date = f"{selected_date} 17:00:00"
-    
-   
-    start_date_filter = pd.to_datetime(start_date)
-    end_date_filter = pd.to_datetime(end_date)
+@lru_cache(maxsize=None)
+def use_dark_template():
+    # Validating the template takes longer than the rest of the app's import, so it is set on the first figure.
+    pio.templates.default = "plotly_dark"
 
-    df['tslast'] = pd.to_datetime(df['tslast'], errors='coerce')
-    df['tsactive'] = pd.to_datetime(df['tsactive'], errors='coerce')
-    
-    mask = (df['tslast'] >= start_date_filter) & (df['tslast'] < end_date_filter)
-    filtered_df = df[mask]
 
-    filtered_df['Equipment Group'] = filtered_df['alarm'].apply(lambda alarm: map_to_equipment_group(alarm, equipment_grouping)).dropna()
+def empty_figure():
+    use_dark_template()
+    return go.Figure()
 
-    alarm_downtime_totals = filtered_df.groupby(['Equipment Group'])['time_difference_minutes'].sum().reset_index()
 
-    alarm_downtime_totals = alarm_downtime_totals.sort_values('time_difference_minutes', ascending=False)
-    filtered_df['Equipment Group'] = pd.Categorical(filtered_df['Equipment Group'], categories=alarm_downtime_totals['Equipment Group'], ordered=True)
-    filtered_df = filtered_df.sort_values('Equipment Group', ascending=False)
-    filtered_df['tslast'] = pd.to_datetime(filtered_df['tslast'])
-    time_range = pd.date_range(start=start_date, end=end_date, freq='h')
+DEFAULT_SHIFT = (7, 17)
+
 
-    alarm_group = filtered_df['Equipment Group'].unique()
+def shift_window(selected_date, shift=DEFAULT_SHIFT):
+    day = pd.Timestamp(selected_date).normalize()
+    return day + pd.Timedelta(hours=shift[0]), day + pd.Timedelta(hours=shift[1])
+
+
+def create_figure(selected_date,df,packed=True,shift=DEFAULT_SHIFT,site=None):
+    site = site or default_site
+    use_dark_template()
+    start_date, end_date = shift_window(selected_date, shift)
+    day = start_date.normalize()
+    
+   
+    with stage('slice'):
+        filtered_df = overlapping_rows(df, start_date, end_date, max_duration=site.store.max_duration).copy()
+    count('rows', len(filtered_df))
+    with stage('classify'):
+        filtered_df['Equipment Group'] = site.grouping.classify(filtered_df['alarm'])
+
+    with stage('timeline'):
+        segments = interval_timeline(filtered_df, start_date, end_date, 'Equipment Group')
+    count('segments', len(segments))
+    time_range = pd.date_range(start=start_date, end=end_date, freq='h')
 
     fig = go.Figure()
 
     bar_width = 0.25
 
-    for equipment_group in alarm_group:
-        alarm_data = filtered_df[filtered_df['Equipment Group'] == equipment_group]
-        last_time = pd.Timestamp(start_date)
-
-        for hour in time_range:
-            active_alarms = alarm_data[(alarm_data['tslast'] >= last_time) & (alarm_data['tslast'] < hour)]
-            downtime_total = active_alarms['time_difference_minutes'].sum()
-            alarms_list = active_alarms['alarm'].unique()
-
-            if downtime_total > 0:
-                if (hour - last_time).total_seconds() / 60 > 0:
-                    active_time = (hour - last_time).total_seconds() / 60 - downtime_total
-                    start_time = active_alarms['tsactive'].iloc[0] if not active_alarms.empty else last_time
-
-                    
-                    start_time_in_minutes = (start_time - pd.Timestamp(start_time.date())).total_seconds() / 60
-                    
-                    alarms_hover = "<br>".join(alarms_list)
-
-                    fig.add_trace(go.Bar(
-                        y=[equipment_group],
-                        x=[active_time],
-                        width=bar_width,
-                        orientation='h',
-                        name='Good State',
-                        marker_color='lightgreen',
-                        base=last_time.hour * 60 + last_time.minute,
-                        hovertemplate=f'Start Time: {start_time.strftime("%Y-%m-%d %H:%M")} <br>Equipment: {equipment_group} Type: Good State<br>Duration: {minutes_to_hhmm(round(active_time, 2))}<extra></extra>',
-                        showlegend=False
-                    ))
-
-                    fig.add_trace(go.Bar(
-                        y=[equipment_group],
-                        x=[downtime_total],
-                        width=bar_width,
-                        orientation='h',
-                        name='Active Alarm',
-                        marker_color='red',
-                        base=last_time.hour * 60 + last_time.minute + active_time,
-                        hovertemplate=f'Start Time: {start_time.strftime("%Y-%m-%d %H:%M")} <br>Equipment: {equipment_group} <br>Alarms: {alarms_hover}<br>Type: Active Alarm<br>Duration: {minutes_to_hhmm(round(downtime_total, 2))}<extra></extra>',
-                        showlegend=False
-                    ))
-                last_time = hour
-
-
-        if last_time < time_range[-1]:
-            remaining_time = (time_range[-1] - last_time).total_seconds() / 60
-            fig.add_trace(go.Bar(
-                y=[equipment_group],
-                x=[remaining_time],
-                width=bar_width,
-                orientation='h',
-                name='Good State',
-                marker_color='lightgreen',
-                base=last_time.hour * 60 + last_time.minute,
-                hovertemplate=f'Equipment: {equipment_group} <br>Alarms: None<br>Type: Good State<br>Duration: {minutes_to_hhmm(round(remaining_time, 2))}<extra></extra>',
-                showlegend=False
-            ))
-
-        
-    date_min = filtered_df['tslast'].min().replace(hour=7, minute=0, second=0)
-    date_max = filtered_df['tslast'].max().replace(hour=17, minute=0, second=0)
+    with stage('traces'):
+        base = (segments['start'] - day) / pd.Timedelta(minutes=1)
+        down = segments['downtime'] > 0
+        good_customdata = [
+            [f'Start Time: {start_time.strftime("%Y-%m-%d %H:%M")} <br>', '', minutes_to_hhmm(round(active_time, 2))] if has_downtime
+            else ['', '<br>Alarms: None<br>', minutes_to_hhmm(round(active_time, 2))]
+            for start_time, active_time, has_downtime in zip(segments['first_tsactive'], segments['active'], down)
+        ]
+        alarm_customdata = [
+            [start_time.strftime("%Y-%m-%d %H:%M"), "<br>".join(alarms), minutes_to_hhmm(round(downtime_total, 2))]
+            for start_time, alarms, downtime_total
+            in zip(segments['first_tsactive'][down], segments['alarms'][down], segments['downtime'][down])
+        ]
+
+        fig.add_traces(state_bar_traces(
+            'Good State', 'lightgreen', segments['group'], segments['active'], base, good_customdata,
+            '%{customdata[0]}Equipment: %{y} %{customdata[1]}Type: Good State<br>Duration: %{customdata[2]}<extra></extra>',
+            bar_width, packed
+        ))
+        fig.add_traces(state_bar_traces(
+            'Active Alarm', 'red', segments['group'][down], segments['downtime'][down],
+            base[down] + segments['active'][down], alarm_customdata,
+            'Start Time: %{customdata[0]} <br>Equipment: %{y} <br>Alarms: %{customdata[1]}<br>Type: Active Alarm<br>Duration: %{customdata[2]}<extra></extra>',
+            bar_width, packed
+        ))
+    count('traces', len(fig.data))
 
-    
     fig.update_layout(
         title="Active Alarm and Good State Duration by Alarm and Equipment Group",
         xaxis_title="Timstamp",
@@ -260,56 +226,420 @@ def create_figure(selected_date,df):
         height=750,
         xaxis=dict(
             tickmode='array',
-            tickvals=[(hour.hour * 60) for hour in time_range],
+            tickvals=[(hour - day) / pd.Timedelta(minutes=1) for hour in time_range],
             ticktext=[hour.strftime('%Y-%m-%d %H:%M') for hour in time_range],
             showgrid=True
         ),
-        yaxis=dict(tickfont=dict(size=10)),
+        yaxis=dict(tickfont=dict(size=10), categoryorder='array', categoryarray=list(segments['group'].cat.categories)),
         font=dict(color='white')
     )
 
     return fig
 
 
+def create_trend_figure(totals, period):
+    use_dark_template()
+    fig = go.Figure()
+    for equipment_group, group_totals in totals.groupby('Equipment Group', observed=True, sort=False):
+        fig.add_trace(go.Bar(
+            x=group_totals['period'],
+            y=group_totals['downtime_minutes'],
+            customdata=group_totals[['alarm_count']],
+            name=str(equipment_group),
+            hovertemplate=f'Equipment: {equipment_group}<br>%{{x}}<br>Downtime: %{{y:.0f}} minutes<br>Alarms: %{{customdata[0]}}<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title=f"Downtime by Equipment Group per {period.capitalize()}",
+        xaxis_title="Period",
+        yaxis_title="Downtime (minutes)",
+        barmode='stack',
+        height=500,
+        font=dict(color='white')
+    )
+    return fig
+
+
+LIVE_HOVER = 'Start Time: %{customdata[0]} <br>Equipment: %{y} <br>Alarm: %{customdata[1]}<br>Type: Active Alarm<br>Duration: %{customdata[2]}<extra></extra>'
+
+
+def live_bars(pieces, new_groups, start_date, end_date):
+    """Bar arrays of the live view: a good-state bar per new group and a red bar per downtime piece."""
+    day = start_date.normalize()
+    shift_minutes = (end_date - start_date) / pd.Timedelta(minutes=1)
+    good = dict(y=list(new_groups), x=[shift_minutes] * len(new_groups),
+                base=[(start_date - day) / pd.Timedelta(minutes=1)] * len(new_groups),
+                customdata=[['', '', minutes_to_hhmm(shift_minutes)]] * len(new_groups))
+    alarm = dict(y=[], x=[], base=[], customdata=[])
+    for group, start_time, end_time, alarm_name in pieces:
+        minutes = (end_time - start_time) / pd.Timedelta(minutes=1)
+        alarm['y'].append(group)
+        alarm['x'].append(minutes)
+        alarm['base'].append((start_time - day) / pd.Timedelta(minutes=1))
+        alarm['customdata'].append([start_time.strftime('%H:%M:%S'), alarm_name, minutes_to_hhmm(round(minutes, 2))])
+    return good, alarm
+
+
+def create_live_figure(timeline, key, pieces, groups):
+    """Live shift figure of ``pieces`` of ``timeline``; ``key`` keeps the zoom while the timeline is the same."""
+    use_dark_template()
+    good, alarm = live_bars(pieces, groups, timeline.start, timeline.end)
+    day = timeline.start.normalize()
+    time_range = pd.date_range(start=timeline.start, end=timeline.end, freq='h')
+
+    fig = go.Figure()
+    fig.add_traces(state_bar_traces('Good State', 'lightgreen', good['y'], good['x'], good['base'], good['customdata'],
+                                    'Equipment: %{y} <br>Type: Good State<extra></extra>', 0.25))
+    fig.add_traces(state_bar_traces('Active Alarm', 'red', alarm['y'], alarm['x'], alarm['base'], alarm['customdata'],
+                                    LIVE_HOVER, 0.25))
+    fig.update_layout(
+        title="Current Shift: Active Alarms by Equipment Group",
+        xaxis_title="Timstamp",
+        yaxis_title="Equipment Group",
+        barmode='overlay',
+        height=500,
+        uirevision=key,
+        xaxis=dict(
+            tickmode='array',
+            tickvals=[(hour - day) / pd.Timedelta(minutes=1) for hour in time_range],
+            ticktext=[hour.strftime('%H:%M') for hour in time_range],
+            range=[(timeline.start - day) / pd.Timedelta(minutes=1), (timeline.end - day) / pd.Timedelta(minutes=1)],
+            showgrid=True
+        ),
+        yaxis=dict(tickfont=dict(size=10), categoryorder='category ascending'),
+        font=dict(color='white')
+    )
+    return fig
+
+
+def live_extend_data(pieces, new_groups, start_date, end_date):
+    """``extendData`` for ``Graph``: append the new groups to trace 0 and the new pieces to trace 1."""
+    good, alarm = live_bars(pieces, new_groups, start_date, end_date)
+    return [{key: [good[key], alarm[key]] for key in ('y', 'x', 'base', 'customdata')}, [0, 1]]
+
 
+def figure_key(selected_date, df, shift=DEFAULT_SHIFT, site=None):
+    site = site or default_site
+    start_date, end_date = shift_window(selected_date, shift)
+    return ('alarm-graph', FIGURE_CACHE_VERSION, site.name, str(selected_date), tuple(shift),
+            frame_fingerprint(overlapping_rows(df, start_date, end_date, max_duration=site.store.max_duration)), site.grouping.index.fingerprint)
 
-yesterday = (datetime.now() - timedelta(days=1)).date()
-
-app.layout = html.Div([
-    html.Link(rel='stylesheet', href='/assets/styles.css'),
-    html.H1("Aluecor Equipment Dashboard"),
-    html.Div(id='dashboard-info', children=[
-        "This dashboard presents the alarms data for the plant equipment."
-    ]),
-    html.Div(
-        dcc.DatePickerSingle(
-        id='date-picker',
-        date=yesterday,
-        display_format='YYYY-MM-DD',
-        style={'margin': '20px'}
-    ),
-        style={'textAlign': 'Center', 'margin': '20px 0'}
-    ),
-    dcc.Loading(
-        id="loading-spinner",
-        type="circle",  
-        children=[
-            dcc.Graph(id='alarm-graph')
-        ],
-        fullscreen=True  
+
+PREWARM_DAYS = int(os.getenv('PREWARM_DAYS', '7'))
+
+
+def prewarm_job(site):
+    def prewarm_figures():
+        df_alarms = site.store.get()
+        today = datetime.now().date()
+        for days_back in range(1, PREWARM_DAYS + 1):
+            selected_date = str(today - timedelta(days=days_back))
+            site.figure_cache.get_or_create(figure_key(selected_date, df_alarms, site=site),
+                                            lambda: create_figure(selected_date, df_alarms, site=site))
+    return prewarm_figures
+
+
+for site in sites.values():
+    site.scheduler = RefreshScheduler.from_env(
+        site.store, [prewarm_job(site)], instrumentation=instrumentation, interval=site.refresh_seconds,
+        name='scheduler' if len(sites) == 1 else f'scheduler-{site.name}'
     )
-])
+    instrumentation.add_gauge('alarm_rows', 'Alarm rows held by the store.',
+                              lambda site=site: site.store.status()['rows'], site=site.name)
+    instrumentation.add_gauge('alarm_refresh_age_seconds', 'Seconds since the last successful refresh.',
+                              lambda site=site: site.store.status()['refresh_age_seconds'], site=site.name)
+    instrumentation.add_gauge('alarm_refresh_failures', 'Consecutive failed refreshes.',
+                              lambda site=site: site.store.consecutive_failures, site=site.name)
+    instrumentation.add_gauge('unknown_alarms', 'Distinct alarms in the store that the equipment grouping does not list.',
+                              lambda site=site: len(site.grouping.unknown_alarms), site=site.name)
+    instrumentation.add_gauge('figure_cache_hits', 'Figure cache hits.',
+                              lambda site=site: site.figure_cache.hits, site=site.name)
+    instrumentation.add_gauge('figure_cache_misses', 'Figure cache misses.',
+                              lambda site=site: site.figure_cache.misses, site=site.name)
+    instrumentation.add_gauge('analytics_cache_hits', 'Analytics results served from memory.',
+                              lambda site=site: site.analytics.hits, site=site.name)
+    instrumentation.add_gauge('analytics_cache_misses', 'Analytics results computed.',
+                              lambda site=site: site.analytics.misses, site=site.name)
+
+scheduler = default_site.scheduler
+
+
+@server.before_request
+def start_scheduler():
+    if os.getenv('BACKGROUND_SCHEDULER', 'true').lower() in ('1', 'true', 'yes', 'on'):
+        for site in sites.values():
+            site.scheduler.ensure_started()
+
+
+@server.route('/health')
+def health():
+    statuses = {name: {**site.scheduler.status(), 'unknown_alarms': site.grouping.unknown_alarms}
+                for name, site in sites.items()}
+    healthy = all(status['healthy'] for status in statuses.values())
+    return jsonify({'healthy': healthy, 'sites': statuses}), 200 if healthy else 503
+
+
+@server.route('/metrics')
+def metrics():
+    return Response(instrumentation.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@server.route('/api/analytics/<analysis>')
+def analytics_api(analysis):
+    """Alarm analytics as JSON; see the README for the analyses and their parameters."""
+    if analysis not in ANALYSES:
+        return jsonify({'error': f"Unknown analysis: {analysis}"}), 404
+    site_name = request.args.get('site', default_site.name)
+    site = sites.get(site_name)
+    if site is None:
+        return jsonify({'error': f"Unknown site: {site_name}"}), 404
+    by = request.args.get('by', 'equipment')
+    try:
+        end = pd.Timestamp(request.args.get('end') or pd.Timestamp(datetime.now().date()) + pd.Timedelta(days=1))
+        start = pd.Timestamp(request.args.get('start') or end - pd.Timedelta(days=30))
+        params = {name: kind(request.args[name]) for name, kind in PARAMETERS[analysis].items() if name in request.args}
+        with instrumentation.request(f'analytics_{analysis}'):
+            rows = site.analytics.query(analysis, start, end, by=by, **params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'site': site.name, 'analysis': analysis, 'start': start.isoformat(), 'end': end.isoformat(),
+                    'by': by, **params, 'rows': rows})
+
+
+def debug_table(traces):
+    stage_names = list(dict.fromkeys(name for trace in traces for name in trace['stages']))
+    header = ['Request', 'Started', 'Total ms'] + [f'{name} ms' for name in stage_names] + ['Counts', 'Peak MB']
+    rows = []
+    for trace in traces:
+        peak = trace['peak_memory_bytes']
+        rows.append(html.Tr(
+            [html.Td(trace['request']), html.Td(trace['started_at'][11:19]), html.Td(f"{trace['seconds'] * 1000:.0f}")]
+            + [html.Td(f"{trace['stages'][name] * 1000:.0f}" if name in trace['stages'] else '') for name in stage_names]
+            + [html.Td(', '.join(f'{name}={value}' for name, value in trace['counts'].items())),
+               html.Td('' if peak is None else f'{peak / 2**20:.1f}')]
+        ))
+    return html.Table([html.Thead(html.Tr([html.Th(column) for column in header])), html.Tbody(rows)])
+
+
+def serve_layout():
+    yesterday = (datetime.now() - timedelta(days=1)).date()
+    return html.Div([
+        html.Link(rel='stylesheet', href='/assets/styles.css'),
+        dcc.Store(id='client-id', data=uuid.uuid4().hex),
+        html.H1("Aluecor Equipment Dashboard"),
+        html.Div(id='dashboard-info', children=[
+            "This dashboard presents the alarms data for the plant equipment."
+        ]),
+        html.Div(
+            dcc.Dropdown(
+                id='site-picker',
+                options=[{'label': site.title, 'value': name} for name, site in sites.items()],
+                value=default_site.name,
+                clearable=False
+            ),
+            style={'margin': '20px 40px'} if len(sites) > 1 else {'display': 'none'}
+        ),
+        html.Div(
+            dcc.DatePickerSingle(
+            id='date-picker',
+            date=yesterday,
+            display_format='YYYY-MM-DD',
+            style={'margin': '20px'}
+        ),
+            style={'textAlign': 'Center', 'margin': '20px 0'}
+        ),
+        html.Div(
+            dcc.RangeSlider(
+                id='shift-hours',
+                min=0,
+                max=24,
+                step=1,
+                value=list(DEFAULT_SHIFT),
+                marks={hour: f'{hour:02d}:00' for hour in range(0, 25, 2)},
+                allowCross=False
+            ),
+            style={'margin': '0 40px'}
+        ),
+        html.Div(id='alarm-graph-status', style={'textAlign': 'Center'}),
+        dcc.Interval(id='alarm-graph-poll', interval=1000, disabled=True),
+        dcc.Graph(id='alarm-graph'),
+        html.H2("Downtime Trends"),
+        html.Div([
+            dcc.DatePickerRange(
+                id='trend-range',
+                start_date=yesterday - timedelta(days=29),
+                end_date=yesterday,
+                display_format='YYYY-MM-DD'
+            ),
+            dcc.RadioItems(
+                id='trend-period',
+                options=[{'label': period.capitalize(), 'value': period} for period in ('day', 'week', 'month')],
+                value='day',
+                inline=True,
+                style={'margin': '10px'}
+            )
+        ], style={'textAlign': 'Center', 'margin': '20px 0'}),
+        html.Div(id='trend-graph-status', style={'textAlign': 'Center'}),
+        dcc.Interval(id='trend-graph-poll', interval=1000, disabled=True),
+        dcc.Graph(id='trend-graph'),
+        html.H2("Live Shift"),
+        html.Div(id='live-status', style={'textAlign': 'Center'}),
+        dcc.Interval(id='live-poll', interval=int(LIVE_POLL_SECONDS * 1000)),
+        dcc.Store(id='live-state'),
+        dcc.Graph(id='live-graph'),
+        *([html.Details([
+            html.Summary("Debug: recent requests"),
+            dcc.Interval(id='debug-interval', interval=5000),
+            html.Div(id='debug-panel')
+        ], id='debug-details')] if DEBUG_PANEL else [])
+    ])
+
+app.layout = serve_layout
+
+def poll_background(key, build, client, loading_message):
+    """Build in the background and return ``(figure, poll disabled, status)`` for a polling callback.
+
+    The callback waits up to ``BACKGROUND_WAIT_SECONDS`` so cached views are
+    returned at once; otherwise it returns straight away and the enabled
+    ``dcc.Interval`` calls it again until the build is done. Identical
+    requests from several dashboards share one build, and a client that
+    asks for another view stops waiting for (and may cancel) the old one.
+    """
+    try:
+        done, figure = background_jobs.wait(key, build, client=client, timeout=BACKGROUND_WAIT_SECONDS)
+    except Exception as e:
+        print(f"Error building {key[0]}: {str(e)}")
+        return no_update, True, f"Could not load the data: {str(e)}"
+    if not done:
+        return no_update, False, loading_message
+    return figure, True, ''
+
+
+def site_label(site):
+    return f' of {site.title}' if len(sites) > 1 else ''
+
+
+def build_graph(selected_date, shift, site):
+    with instrumentation.request('update_graph'):
+        with stage('store'):
+            df_alarms = site.store.get()
+        return site.figure_cache.get_or_create(figure_key(selected_date, df_alarms, shift, site),
+                                               lambda: create_figure(selected_date, df_alarms, shift=shift, site=site))
+
 
 @app.callback(
-    Output('alarm-graph', 'figure'),
-    [Input('date-picker', 'date')]
+    [Output('alarm-graph', 'figure'), Output('alarm-graph-poll', 'disabled'), Output('alarm-graph-status', 'children')],
+    [Input('site-picker', 'value'), Input('date-picker', 'date'), Input('shift-hours', 'value'),
+     Input('alarm-graph-poll', 'n_intervals')],
+    [State('client-id', 'data')]
 )
-def update_graph(selected_date):
-    df_alarms = parse_frappe_api()
-    if selected_date is not None:
-        fig = create_figure(selected_date,df_alarms)
-        return fig
-    return go.Figure()
+def update_graph(site_name, selected_date, shift_hours, _, client_id):
+    client = f'{client_id}:alarm-graph'
+    if selected_date is None:
+        background_jobs.cancel(client)
+        return empty_figure(), True, ''
+    site = sites.get(site_name, default_site)
+    shift = tuple(shift_hours or DEFAULT_SHIFT)
+    return poll_background(('alarm-graph', site.name, str(selected_date), shift),
+                           lambda: build_graph(selected_date, shift, site),
+                           client, f"Loading alarms{site_label(site)} for {selected_date}...")
+
+
+def build_trend_graph(start_date, end_date, period, shift, site):
+    with instrumentation.request('update_trend_graph'):
+        with stage('store'):
+            df_alarms = site.store.get()
+        # The store's newest row and size identify its contents, so a worker that has loaded the same
+        # snapshot serves the trend another worker built from FIGURE_CACHE_DIR.
+        key = ('trend-graph', FIGURE_CACHE_VERSION, site.name, str(start_date), str(end_date), period, tuple(shift),
+               str(site.store.high_water_mark), len(df_alarms), site.grouping.index.fingerprint)
+        return site.figure_cache.get_or_create(key, lambda: trend_figure(start_date, end_date, period, shift, site))
+
+
+def trend_figure(start_date, end_date, period, shift, site):
+    with stage('cube'):
+        totals = site.cube.totals(start_date, pd.Timestamp(end_date) + pd.Timedelta(days=1), period=period,
+                                  shift_start=shift[0], shift_end=shift[1])
+    count('rows', len(totals))
+    with stage('traces'):
+        return create_trend_figure(totals, period)
+
+
+@app.callback(
+    [Output('trend-graph', 'figure'), Output('trend-graph-poll', 'disabled'), Output('trend-graph-status', 'children')],
+    [Input('site-picker', 'value'), Input('trend-range', 'start_date'), Input('trend-range', 'end_date'),
+     Input('trend-period', 'value'), Input('shift-hours', 'value'), Input('trend-graph-poll', 'n_intervals')],
+    [State('client-id', 'data')]
+)
+def update_trend_graph(site_name, start_date, end_date, period, shift_hours, _, client_id):
+    client = f'{client_id}:trend-graph'
+    if start_date is None or end_date is None:
+        background_jobs.cancel(client)
+        return empty_figure(), True, ''
+    site = sites.get(site_name, default_site)
+    shift = tuple(shift_hours or DEFAULT_SHIFT)
+    return poll_background(('trend-graph', site.name, str(start_date), str(end_date), period, shift),
+                           lambda: build_trend_graph(start_date, end_date, period, shift, site),
+                           client, f"Loading downtime trends{site_label(site)} from {start_date} to {end_date}...")
+
+
+def build_live_timeline(start_date, end_date, site):
+    with instrumentation.request('update_live_graph'):
+        return site.live.get(start_date, end_date)
+
+
+@app.callback(
+    [Output('live-graph', 'figure'), Output('live-graph', 'extendData'), Output('live-state', 'data'),
+     Output('live-status', 'children')],
+    [Input('site-picker', 'value'), Input('shift-hours', 'value'), Input('live-poll', 'n_intervals')],
+    [State('live-state', 'data'), State('client-id', 'data')]
+)
+def update_live_graph(site_name, shift_hours, _, state, client_id):
+    """Send the current shift once, then only the downtime pieces added since the client's mark.
+
+    ``live-state`` holds the timeline key, the newest ``tslast`` the client
+    has drawn (``mark``) and the number of rows up to it. Both are derived
+    from the alarm rows, so any worker holding the same rows agrees with them
+    and answers a poll with ``extendData`` for just the new pieces. A worker
+    that has not yet caught up with the client's mark leaves the figure
+    alone; one that disagrees about the rows up to it resends the figure.
+    """
+    site = sites.get(site_name, default_site)
+    shift = tuple(shift_hours or DEFAULT_SHIFT)
+    start_date, end_date = shift_window(datetime.now().date(), shift)
+    try:
+        done, _ = background_jobs.wait(('live-graph', site.name, str(start_date), str(end_date)),
+                                       lambda: build_live_timeline(start_date, end_date, site),
+                                       client=f'{client_id}:live-graph', timeout=BACKGROUND_WAIT_SECONDS)
+    except Exception as e:
+        print(f"Error building live-graph: {str(e)}")
+        return no_update, no_update, no_update, f"Could not load the data: {str(e)}"
+    if not done:
+        return no_update, no_update, no_update, f"Loading the current shift{site_label(site)}..."
+
+    timeline = site.live.get(start_date, end_date)
+    key = f'{site.name}/{site.live.key(start_date, end_date)}'
+    mark, rows = timeline.state()
+    status = f"Current shift{site_label(site)}, updated {datetime.now().strftime('%H:%M:%S')}"
+    if state is not None and state.get('key') == key:
+        client_mark = state.get('mark')
+        if client_mark is not None and (mark is None or mark < client_mark):
+            return no_update, no_update, no_update, status
+        if client_mark is None or timeline.rows_through(client_mark) == state.get('rows'):
+            if mark == client_mark:
+                return no_update, no_update, no_update, status
+            pieces, new_groups = timeline.pieces(after=client_mark, through=mark)
+            return (no_update, live_extend_data(pieces, new_groups, timeline.start, timeline.end),
+                    {'key': key, 'mark': mark, 'rows': rows}, status)
+
+    pieces, groups = timeline.pieces(through=mark)
+    return (create_live_figure(timeline, key, pieces, groups), no_update,
+            {'key': key, 'mark': mark, 'rows': rows}, status)
+
+if DEBUG_PANEL:
+    @app.callback(Output('debug-panel', 'children'), [Input('debug-interval', 'n_intervals')])
+    def update_debug_panel(_):
+        return debug_table(list(instrumentation.recent))
 
 if __name__ == '__main__':
     app.run_server(debug=True)
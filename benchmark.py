@@ -0,0 +1,121 @@
+"""Benchmark the dashboard's heavy paths on synthetic data.
+
+    python benchmark.py --scales 10000 100000 1000000 --repeat 5 --output results.json
+
+For every scale each case reports latency percentiles over ``--repeat`` runs,
+the peak memory traced by ``tracemalloc`` during one extra run and, for
+figures, the size of their JSON. Compare the ``--output`` files of two commits to spot
+regressions.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data import synthetic
+
+
+def measure(build, repeat):
+    """Time ``build`` ``repeat`` times after one warm-up run, then trace one more run for peak memory."""
+    result = build()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = build()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings_ms = np.array(timings) * 1000
+    stats = {
+        'p50_ms': float(np.percentile(timings_ms, 50)),
+        'p95_ms': float(np.percentile(timings_ms, 95)),
+        'max_ms': float(timings_ms.max()),
+        'peak_mb': peak / 2**20,
+    }
+    if hasattr(result, 'to_plotly_json'):
+        stats['json_kb'] = len(result.to_json()) / 1024
+    return stats
+
+
+def alarm_cases(scale, days):
+    import app
+    from data.normalize import normalize_alarms
+
+    records = synthetic.alarm_records(scale, synthetic.alarm_names(app.equipment_grouping), days=days)
+    selected_date = (pd.Timestamp('2024-01-01') + pd.Timedelta(days=days // 2)).date()
+    alarms = normalize_alarms(pd.DataFrame(records))
+    return {
+        'normalize_alarms': lambda: normalize_alarms(pd.DataFrame(records)),
+        'create_figure': lambda: app.create_figure(selected_date, alarms),
+    }
+
+
+def trend_cases(scale):
+    from data.press_data import create_plot, fetch_all_data_from_uploaded_file
+
+    contents = synthetic.upload_contents(synthetic.trend_sqlite_bytes(scale))
+    trends = fetch_all_data_from_uploaded_file(contents)
+    return {
+        'fetch_all_data_from_uploaded_file': lambda: fetch_all_data_from_uploaded_file(contents),
+        'create_plot': lambda: create_plot(trends),
+    }
+
+
+def thermocouple_cases(scale):
+    from data.thermocouple_heatmaps import ThermocoupleRollup, generate_heatmap_thermocouple
+
+    readings = synthetic.thermocouple_frame(scale)
+    start, end = str(readings.index[0].date()), str(readings.index[-1].date())
+    rollup = ThermocoupleRollup(readings)
+    return {
+        'generate_heatmap_thermocouple': lambda: generate_heatmap_thermocouple(readings, start, end, 'Thermocouple 1'),
+        'generate_heatmap_thermocouple (rollup)': lambda: generate_heatmap_thermocouple(
+            readings, start, end, 'Thermocouple 1', rollup=rollup),
+    }
+
+
+SUITES = {
+    'alarms': lambda scale, args: alarm_cases(scale, args.days),
+    'trends': lambda scale, args: trend_cases(scale),
+    'thermocouples': lambda scale, args: thermocouple_cases(scale),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--days', type=int, default=30, help='days of alarm history to generate')
+    parser.add_argument('--suites', nargs='+', choices=list(SUITES), default=list(SUITES))
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    results = []
+    print(f"{'case':<40} {'rows':>9} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'peak MB':>9} {'JSON KB':>9}")
+    for suite in args.suites:
+        for scale in args.scales:
+            for case, build in SUITES[suite](scale, args).items():
+                stats = measure(build, args.repeat)
+                results.append({'suite': suite, 'case': case, 'rows': scale, **stats})
+                json_kb = f"{stats['json_kb']:9.1f}" if 'json_kb' in stats else f"{'-':>9}"
+                print(f"{case:<40} {scale:>9} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f} "
+                      f"{stats['max_ms']:>10.1f} {stats['peak_mb']:>9.1f} {json_kb}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
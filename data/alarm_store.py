@@ -0,0 +1,270 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from data.instrumentation import count, stage
+from data.normalize import concat_alarms, max_duration, normalize_alarms, window_bounds
+from data.snapshot import AlarmSnapshot
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, '') else default
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class AlarmStore:
+    """Process-wide cache of alarm rows with incremental refresh.
+
+    The history is loaded once; afterwards only rows whose ``tslast`` is
+    at or after the last seen ``tslast`` are requested from ``fetch``.
+    ``fetch(since)`` must return a DataFrame (or list of records) with
+    ``tslast >= since``. The initial load receives ``None``, or the start of
+    the ``retention`` window when one is set. Fetched rows are passed through
+    ``normalize`` once, so the cached frame is typed and sorted by ``tslast``.
+
+    With a ``snapshot`` (see ``data.snapshot.AlarmSnapshot``) the frame is
+    memory-mapped from disk and only the delta since the snapshot's
+    high-water mark is fetched. Refreshes are serialized across processes
+    by the snapshot lock. The worker that fetches new rows writes the next
+    generation, and the other workers pick it up.
+    """
+
+    def __init__(self, fetch, refresh_interval=300, retention=None, max_rows=None,
+                 stale_while_revalidate=True, normalize=normalize_alarms, snapshot=None):
+        self.fetch = fetch
+        self.normalize = normalize
+        self.snapshot = snapshot
+        self.refresh_interval = refresh_interval
+        self.retention = retention
+        self.max_rows = max_rows
+        self.stale_while_revalidate = stale_while_revalidate
+        self.auto_refresh = True
+        self.listeners = []
+
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_success_at = None
+
+        self._df = None
+        self._high_water_mark = None
+        self._max_duration = pd.Timedelta(0)
+        self._generation = None
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+
+    @classmethod
+    def from_env(cls, fetch, partition=None, **kwargs):
+        """Store configured from the environment; ``kwargs`` override it.
+
+        ``partition`` keeps the snapshot of one site apart from the others.
+        """
+        retention_days = _env_float('ALARM_RETENTION_DAYS', 0)
+        options = dict(
+            refresh_interval=_env_float('ALARM_REFRESH_SECONDS', 300),
+            retention=pd.Timedelta(days=retention_days) if retention_days > 0 else None,
+            max_rows=_env_int('ALARM_MAX_ROWS', 0) or None,
+            stale_while_revalidate=_env_bool('ALARM_STALE_WHILE_REVALIDATE', True),
+            snapshot=AlarmSnapshot.from_env(partition),
+        )
+        options.update(kwargs)
+        return cls(fetch, **options)
+
+    @property
+    def high_water_mark(self):
+        return self._high_water_mark
+
+    @property
+    def max_duration(self):
+        """Upper bound on the cached alarms' durations, for ``overlapping_rows``."""
+        return self._max_duration
+
+    @property
+    def last_refresh(self):
+        return self._last_refresh
+
+    def is_stale(self):
+        return time.monotonic() - self._last_refresh >= self.refresh_interval
+
+    def add_listener(self, listener):
+        """Call ``listener(df, added)`` after every change to the cached frame.
+
+        ``added`` holds only the rows that were not cached before, or is
+        ``None`` when the whole frame was replaced (first load or a snapshot
+        written by another process).
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, df, added):
+        for listener in self.listeners:
+            try:
+                listener(df, added)
+            except Exception as e:
+                print(f"Error in alarm store listener {getattr(listener, '__name__', listener)}: {str(e)}")
+
+    def status(self):
+        df = self._df
+        now = datetime.now()
+        return {
+            'rows': 0 if df is None else len(df),
+            'high_water_mark': None if self._high_water_mark is None else str(self._high_water_mark),
+            'data_lag_seconds': None if self._high_water_mark is None
+            else (now - self._high_water_mark).total_seconds(),
+            'last_success_at': None if self.last_success_at is None else self.last_success_at.isoformat(),
+            'refresh_age_seconds': None if self.last_success_at is None
+            else (now - self.last_success_at).total_seconds(),
+            'snapshot_generation': self._generation,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+        }
+
+    def get(self):
+        """Return the cached alarm frame, refreshing it if it is stale.
+
+        The returned frame is shared between callers and must not be mutated.
+        With ``auto_refresh`` off (a scheduler keeps the store fresh) reads
+        never trigger a refresh once the first load has completed.
+        """
+        if self._df is None:
+            self.refresh()
+        elif self.auto_refresh and self.is_stale():
+            if self.stale_while_revalidate:
+                self._refresh_in_background()
+            else:
+                self.refresh()
+        return self._df if self._df is not None else self.normalize(pd.DataFrame())
+
+    def refresh(self, force=False):
+        """Fetch new rows and merge them into the cache. Only one refresh runs at a time."""
+        with self._refresh_lock:
+            if not force and self._df is not None and not self.is_stale():
+                return self._df
+            if self.snapshot is None:
+                self._fetch_and_merge()
+            else:
+                with self.snapshot.lock():
+                    self._load_snapshot()
+                    self._fetch_and_merge()
+            return self._df
+
+    def _fetch_and_merge(self):
+        try:
+            since = self._high_water_mark
+            if since is None and self.retention is not None:
+                # Rows older than the retention window would be evicted as soon as they were merged.
+                since = pd.Timestamp.now() - self.retention
+            with stage('fetch'):
+                new_rows = self.fetch(since)
+        except Exception as e:
+            print(f"Error refreshing alarm store: {str(e)}")
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(e)
+            return
+        with stage('normalize'):
+            new_rows = self.normalize(pd.DataFrame(new_rows))
+        with stage('merge'):
+            self._merge(new_rows)
+        self.consecutive_failures = 0
+        self.last_success_at = datetime.now()
+
+    def _load_snapshot(self):
+        generation = self.snapshot.current_generation()
+        if generation is None or generation == self._generation:
+            return
+        try:
+            df, manifest = self.snapshot.load()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading alarm snapshot: {str(e)}")
+            return
+        print(f"Alarm snapshot generation {generation} loaded: {manifest['rows']} records")
+        longest = max_duration(df)
+        with self._lock:
+            self._df = df
+            self._max_duration = longest
+            self._generation = generation
+            if not df.empty:
+                self._high_water_mark = df['tslast'].iloc[-1]
+        self._notify(df, None)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, name='alarm-store-refresh', daemon=True)
+            self._refresh_thread.start()
+
+    def _merge(self, new_rows):
+        current = self._df
+        if current is None or current.empty or new_rows.empty:
+            merged = concat_alarms([current, new_rows] if current is not None else [new_rows])
+            added = new_rows if current is not None else None
+        else:
+            # Only cached rows at or after the first new tslast can be duplicates.
+            overlap_start, _ = window_bounds(current, new_rows['tslast'].iloc[0], current['tslast'].iloc[-1])
+            overlap = current.iloc[overlap_start:]
+            tail = concat_alarms([overlap, new_rows], sort=False)
+            duplicated = tail.duplicated().to_numpy()
+            added = tail.iloc[len(overlap):][~duplicated[len(overlap):]].reset_index(drop=True)
+            tail = tail[~duplicated].sort_values('tslast', kind='stable', ignore_index=True)
+            merged = concat_alarms([current.iloc[:overlap_start], tail])
+
+        if added is not None and added.empty:
+            # Every refresh fetches the rows at the high-water mark again; when nothing is new the frame,
+            # its snapshot generation and the listeners are left alone. Eviction waits for the next new rows.
+            print(f'Records cached: {current.shape[0]} (+0 new of {new_rows.shape[0]} fetched)')
+            self._last_refresh = time.monotonic()
+            return
+
+        if not merged.empty and 'tslast' in merged:
+            tslast = pd.to_datetime(merged['tslast'], errors='coerce')
+            merged = self._evict(merged, tslast)
+            tslast = pd.to_datetime(merged['tslast'], errors='coerce')
+            if tslast.notna().any():
+                self._high_water_mark = tslast.max()
+
+        if self.snapshot is not None and merged is not current and not merged.empty:
+            try:
+                with stage('snapshot_write'):
+                    self._generation = self.snapshot.write(merged)
+                    merged, _ = self.snapshot.load()
+            except (OSError, ValueError) as e:
+                print(f"Error writing alarm snapshot: {str(e)}")
+
+        # Evicted rows only make the bound looser, so it is only recomputed in full on a first load.
+        longest = max_duration(merged) if added is None else max(self._max_duration, max_duration(added))
+
+        print(f'Records cached: {merged.shape[0]} (+{new_rows.shape[0]} fetched)')
+        count('rows_cached', merged.shape[0])
+        with self._lock:
+            self._df = merged
+            self._max_duration = longest
+            self._last_refresh = time.monotonic()
+        self._notify(merged, added)
+
+    def _evict(self, df, tslast):
+        keep = pd.Series(True, index=df.index)
+        if self.retention is not None:
+            keep &= tslast >= pd.Timestamp.now() - self.retention
+        if self.max_rows is not None and keep.sum() > self.max_rows:
+            newest = tslast[keep].sort_values(kind='stable').index[-self.max_rows:]
+            keep &= df.index.isin(newest)
+        return df[keep].reset_index(drop=True) if not keep.all() else df
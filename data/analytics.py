@@ -0,0 +1,277 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data.downtime_cube import PERIODS
+from data.instrumentation import count, stage
+from data.normalize import overlapping_rows
+from data.timeline import alarm_intervals, merge_intervals
+
+
+_NS_PER_MINUTE = 60 * 10**9
+
+
+GROUP_COLUMNS = {
+    'equipment': 'Equipment Group',
+    'alarm': 'alarm',
+}
+
+
+def _activations(df, intervals, start, end):
+    """Codes and start times (int64 ns) of the distinct activations in ``[start, end)``, sorted by group and start.
+
+    ``intervals`` is the result of ``alarm_intervals`` for ``df``. Rows of
+    one activation that was fetched again with a later ``tslast`` share their
+    alarm and start and are counted once; different alarms of a group that
+    start together are separate activations.
+    """
+    rows, groups, starts, _ = intervals
+    inside = (starts >= pd.Timestamp(start).value) & (starts < pd.Timestamp(end).value)
+    alarms, _ = pd.factorize(df['alarm'].iloc[rows[inside]])
+    codes = groups.codes[inside].astype('int64')
+    starts = starts[inside]
+    order = np.lexsort((starts, alarms))
+    alarms, starts_by_alarm = alarms[order], starts[order]
+    distinct = np.ones(len(order), dtype=bool)
+    distinct[1:] = (alarms[1:] != alarms[:-1]) | (starts_by_alarm[1:] != starts_by_alarm[:-1])
+    codes, starts = codes[order[distinct]], starts[order[distinct]]
+    order = np.lexsort((starts, codes))
+    return codes[order], starts[order]
+
+
+def _downtime_minutes(intervals, start, end):
+    """Merged downtime minutes per group code clipped to ``[start, end)``, and the number of merged intervals."""
+    _, groups, starts, ends = intervals
+    window_start, window_end = pd.Timestamp(start).value, pd.Timestamp(end).value
+    overlaps = (ends > window_start) & (starts < window_end) & (ends > starts)
+    _, _, codes, starts, ends = merge_intervals(groups.codes[overlaps].astype('int64'), starts[overlaps], ends[overlaps])
+    minutes = (np.minimum(ends, window_end) - np.maximum(starts, window_start)) / _NS_PER_MINUTE
+    n_groups = len(groups.categories)
+    return np.bincount(codes, weights=minutes, minlength=n_groups), np.bincount(codes, minlength=n_groups)
+
+
+def reliability(df, start, end, group_col):
+    """Alarm frequency, downtime, MTTR and MTBF per group over ``[start, end)``.
+
+    A failure is one merged downtime interval, so overlapping alarms of a
+    group count as one failure. MTTR is the mean failure duration and MTBF
+    the mean uptime between failures, both in minutes; they are missing for
+    groups without failures. Sorted by downtime, highest first.
+    """
+    window_minutes = (pd.Timestamp(end) - pd.Timestamp(start)) / pd.Timedelta(minutes=1)
+    intervals = alarm_intervals(df, group_col)
+    categories = intervals[1].categories
+    codes, _ = _activations(df, intervals, start, end)
+    alarms = np.bincount(codes, minlength=len(categories))
+    downtime, failures = _downtime_minutes(intervals, start, end)
+    active = (alarms > 0) | (failures > 0)
+    categories, alarms, downtime, failures = categories[active], alarms[active], downtime[active], failures[active]
+    uptime = window_minutes - downtime
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mttr = np.where(failures > 0, downtime / failures, np.nan)
+        mtbf = np.where(failures > 0, uptime / failures, np.nan)
+
+    result = pd.DataFrame({
+        'group': categories.astype(str),
+        'alarms': alarms,
+        'alarms_per_day': alarms / (window_minutes / 1440),
+        'failures': failures,
+        'downtime_minutes': downtime,
+        'uptime_minutes': uptime,
+        'availability': uptime / window_minutes,
+        'mttr_minutes': mttr,
+        'mtbf_minutes': mtbf,
+    })
+    return result.sort_values(['downtime_minutes', 'alarms'], ascending=False, kind='stable', ignore_index=True)
+
+
+def pareto(df, start, end, group_col, metric='downtime', top=None):
+    """Groups ranked by downtime minutes or alarm count, with their share and cumulative share.
+
+    ``vital_few`` marks the groups that together make up the first 80 % of
+    the total. ``top`` keeps only the first ``top`` groups; shares are still
+    of the full total.
+    """
+    if metric not in ('downtime', 'count'):
+        raise ValueError(f"Unknown Pareto metric: {metric}")
+    if top is not None and top < 1:
+        raise ValueError("top must be at least 1")
+    intervals = alarm_intervals(df, group_col)
+    categories = intervals[1].categories
+    if metric == 'downtime':
+        values, _ = _downtime_minutes(intervals, start, end)
+    else:
+        codes, _ = _activations(df, intervals, start, end)
+        values = np.bincount(codes, minlength=len(categories))
+
+    order = np.argsort(-values, kind='stable')
+    order = order[values[order] > 0]
+    values = values[order]
+    total = values.sum()
+    share = values / total if total else values * 0.0
+    cumulative = share.cumsum()
+    result = pd.DataFrame({
+        'group': categories[order].astype(str),
+        metric: values,
+        'share': share,
+        'cumulative_share': cumulative,
+        'vital_few': (cumulative - share) < 0.8,
+    })
+    return result if top is None else result.head(top)
+
+
+def frequency(df, start, end, group_col, period='day'):
+    """Alarm activations per group and ``period`` (hour, day, week or month)."""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    freq = PERIODS[period]
+    intervals = alarm_intervals(df, group_col)
+    categories = intervals[1].categories
+    codes, starts = _activations(df, intervals, start, end)
+    times = pd.DatetimeIndex(starts.astype('datetime64[ns]'))
+    periods = times.floor('h') if freq is None else times.to_period(freq).start_time
+    counts = (
+        pd.DataFrame({'period': periods, 'group': pd.Categorical.from_codes(codes, categories)})
+        .groupby(['period', 'group'], observed=True, sort=True)
+        .size()
+        .rename('alarms')
+        .reset_index()
+    )
+    counts['group'] = counts['group'].astype(str)
+    return counts
+
+
+def chattering(df, start, end, group_col, window_seconds=60, min_activations=3):
+    """Groups that activated ``min_activations`` times or more within ``window_seconds``.
+
+    ``bursts`` counts the activations that completed such a run, so a group
+    that chatters for longer has more bursts. Sorted by bursts, highest first.
+    """
+    if min_activations < 2:
+        raise ValueError("min_activations must be at least 2")
+    if not np.isfinite(window_seconds) or window_seconds <= 0:
+        raise ValueError("window_seconds must be a positive number")
+    intervals = alarm_intervals(df, group_col)
+    categories = intervals[1].categories
+    codes, starts = _activations(df, intervals, start, end)
+    lag = min_activations - 1
+    # Activations are sorted by (group, start): a run ends at i when the activation lag places back
+    # belongs to the same group and started at most window_seconds earlier.
+    burst = (codes[lag:] == codes[:-lag]) & (starts[lag:] - starts[:-lag] <= window_seconds * 1e9)
+    burst_codes = codes[lag:][burst]
+    bursts = np.bincount(burst_codes, minlength=len(categories))
+
+    first_burst = np.full(len(categories), np.iinfo('int64').max)
+    np.minimum.at(first_burst, burst_codes, starts[lag:][burst])
+    same = codes[1:] == codes[:-1]
+    min_gap = np.full(len(categories), np.inf)
+    np.minimum.at(min_gap, codes[1:][same], (starts[1:] - starts[:-1])[same] / 1e9)
+
+    chattering_codes = np.flatnonzero(bursts)
+    result = pd.DataFrame({
+        'group': categories[chattering_codes].astype(str),
+        'activations': np.bincount(codes, minlength=len(categories))[chattering_codes],
+        'bursts': bursts[chattering_codes],
+        'first_burst': pd.to_datetime(first_burst[chattering_codes]),
+        'min_gap_seconds': min_gap[chattering_codes],
+    })
+    return result.sort_values(['bursts', 'activations'], ascending=False, kind='stable', ignore_index=True)
+
+
+ANALYSES = {
+    'reliability': reliability,
+    'pareto': pareto,
+    'frequency': frequency,
+    'chattering': chattering,
+}
+
+# Optional parameters of each analysis and their types, for reading them from a query string.
+PARAMETERS = {
+    'reliability': {},
+    'pareto': {'metric': str, 'top': int},
+    'frequency': {'period': str},
+    'chattering': {'window_seconds': float, 'min_activations': int},
+}
+
+
+def records(frame):
+    """JSON-ready rows of ``frame``: timestamps as ISO strings, missing values as ``None``."""
+    frame = frame.copy()
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.strftime('%Y-%m-%dT%H:%M:%S')
+        elif pd.api.types.is_float_dtype(frame[column]):
+            frame[column] = frame[column].round(3)
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+class AlarmAnalytics:
+    """Memoized analyses of one alarm store.
+
+    Results are kept as JSON-ready records per (analysis, range, grouping,
+    parameters), most recently used first, and dropped whenever the store
+    changes. Register ``on_store_change`` with ``AlarmStore.add_listener``.
+    """
+
+    def __init__(self, store, grouping, max_entries=128):
+        self.store = store
+        self.grouping = grouping
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def on_store_change(self, df, added):
+        with self._lock:
+            self._generation += 1
+            self._results.clear()
+
+    def query(self, analysis, start, end, by='equipment', **params):
+        """Records of ``ANALYSES[analysis]`` over alarms overlapping ``[start, end)``, grouped ``by`` equipment or alarm."""
+        if analysis not in ANALYSES:
+            raise KeyError(analysis)
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"Unknown grouping: {by}")
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if start.tz is not None or end.tz is not None:
+            # Alarm times are naive plant-local times; an offset could only be guessed at.
+            raise ValueError("start and end must not have a time zone")
+        if end <= start:
+            raise ValueError("end must be after start")
+        index = self.grouping.index
+        key = (analysis, start, end, by, index.fingerprint, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                count('analytics_cache_hits')
+                return self._results[key]
+            self.misses += 1
+            generation = self._generation
+        count('analytics_cache_misses')
+
+        with stage('store'):
+            df = self.store.get()
+        with self._lock:
+            # Reading the store may have refreshed it; anything computed from an older frame must not be kept.
+            generation = max(generation, self._generation)
+        with stage('slice'):
+            window = overlapping_rows(df, start, end, max_duration=self.store.max_duration)
+        count('rows', len(window))
+        group_col = GROUP_COLUMNS[by]
+        if group_col not in window:
+            with stage('classify'):
+                window = window.assign(**{group_col: index.classify(window['alarm'])})
+        with stage(analysis):
+            result = records(ANALYSES[analysis](window, start, end, group_col, **params))
+
+        with self._lock:
+            if generation == self._generation:
+                self._results[key] = result
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        return result
@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class BackgroundJobs:
+    """Run slow builds on a thread pool, sharing one build between identical requests.
+
+    ``submit(key, build, client)`` starts ``build`` unless a build for ``key``
+    is already queued or running, in which case the caller joins it; so any
+    number of dashboards asking for the same view cost one fetch and one
+    render. Each client waits on at most one key: submitting a new key
+    withdraws the client from its previous one, and a queued build that no
+    client is waiting for any more is cancelled. A build that has already
+    started runs to completion (threads cannot be interrupted) and its result
+    is simply not delivered.
+
+    A finished build is kept for ``result_seconds``, so clients polling a
+    build slower than their wait collect its result on a later poll instead
+    of starting it again.
+    """
+
+    def __init__(self, max_workers=4, result_seconds=30):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='background-job')
+        self.result_seconds = result_seconds
+        self._jobs = {}
+        self._finished = {}
+        self._clients = {}
+        # Reentrant: cancelling a future runs its done callback (_forget) on this thread.
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(max_workers=int(os.getenv('BACKGROUND_WORKERS', '4')),
+                   result_seconds=float(os.getenv('BACKGROUND_RESULT_SECONDS', '30')))
+
+    def submit(self, key, build, client=None):
+        with self._lock:
+            if client is not None:
+                previous = self._clients.get(client)
+                if previous is not None and previous != key:
+                    self._withdraw(client, previous)
+                self._clients[client] = key
+
+            now = time.monotonic()
+            for expired in [finished for finished, (_, expires) in self._finished.items() if expires <= now]:
+                del self._finished[expired]
+            if key in self._finished:
+                return self._finished[key][0]
+
+            job = self._jobs.get(key)
+            if job is None:
+                future = self._executor.submit(build)
+                job = self._jobs[key] = (future, set())
+                future.add_done_callback(lambda _, key=key, future=future: self._forget(key, future))
+            if client is not None:
+                job[1].add(client)
+            return job[0]
+
+    def wait(self, key, build, client=None, timeout=None):
+        """Submit and wait up to ``timeout`` seconds; returns ``(done, result)``.
+
+        Errors raised by ``build`` are re-raised. Finished builds are kept
+        for ``result_seconds`` only, so builds should read through a cache
+        (such as ``FigureCache``) that makes asking again later cheap.
+        """
+        future = self.submit(key, build, client)
+        try:
+            result = future.result(timeout=timeout)
+        except TimeoutError:
+            return False, None
+        self.cancel(client)
+        return True, result
+
+    def cancel(self, client):
+        """Withdraw ``client`` from the build it is waiting for."""
+        with self._lock:
+            key = self._clients.pop(client, None)
+            if key is not None:
+                self._withdraw(client, key)
+
+    def pending(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def _withdraw(self, client, key):
+        job = self._jobs.get(key)
+        if job is None:
+            return
+        future, clients = job
+        clients.discard(client)
+        if not clients:
+            future.cancel()
+
+    def _forget(self, key, future):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job[0] is future:
+                del self._jobs[key]
+                if not future.cancelled() and self.result_seconds > 0:
+                    self._finished[key] = (future, time.monotonic() + self.result_seconds)
+            for client in [client for client, waiting in self._clients.items() if waiting == key]:
+                del self._clients[client]
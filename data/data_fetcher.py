@@ -1,44 +1,124 @@
 import os
+import threading
+from functools import lru_cache
+
 import pandas as pd
-from googleapiclient.discovery import build
 
-def fetch_data(API_KEY, SPREADSHEET_ID):
-    RANGE_ALARM_SUMMARY = 'Alarm Summary'
-    RANGE_DATA_SOURCE = 'Data Source'
-    service = build('sheets', 'v4', developerKey=API_KEY)
-
-   
-    result_alarm_summary = service.spreadsheets().values().get(
-        spreadsheetId=SPREADSHEET_ID, range=RANGE_ALARM_SUMMARY).execute()
-    rows_alarm_summary = result_alarm_summary.get('values', [])
-
-    result_data_source = service.spreadsheets().values().get(
-        spreadsheetId=SPREADSHEET_ID, range=RANGE_DATA_SOURCE).execute()
-    rows_data_source = result_data_source.get('values', [])
-
-    if rows_alarm_summary:
-        headers_alarm = rows_alarm_summary[0]
-        data_alarm_rows = rows_alarm_summary[1:]
-        adjusted_data_alarm_rows = [row[:len(headers_alarm)] for row in data_alarm_rows]
-        df_alarm_summary = pd.DataFrame(adjusted_data_alarm_rows, columns=headers_alarm)
-    else:
-        df_alarm_summary = pd.DataFrame()
-
-    if rows_data_source:
-        headers_data = rows_data_source[0]
-        data_source_rows = rows_data_source[1:]
-        df_data_source = pd.DataFrame(data_source_rows, columns=headers_data)
-    else:
-        df_data_source = pd.DataFrame()
-
-    df = df_data_source[['TSLast', 'TSActive', 'Unit Alarm Occurance']].copy()
+from data.instrumentation import count, stage
+from data.normalize import normalize_alarms
+
+
+RANGE_ALARM_SUMMARY = 'Alarm Summary'
+RANGE_DATA_SOURCE = 'Data Source'
+SHEET_COLUMNS = ['TSLast', 'TSActive', 'Unit Alarm Occurance']
+ALARM_COLUMNS = {
+    'TSLast': 'tslast',
+    'TSActive': 'tsactive',
+    'Unit Alarm Occurance': 'alarm',
+    'Time_Difference_minutes': 'time_difference_minutes',
+}
+
+
+@lru_cache(maxsize=None)
+def sheets_service(api_key):
+    """Sheets API client for ``api_key``, built once per process."""
+    # Imported here so deployments that read alarms from Frappe do not need the Google client.
+    from googleapiclient.discovery import build
+    return build('sheets', 'v4', developerKey=api_key, cache_discovery=False)
+
+
+def rows_to_frame(rows, headers):
+    """DataFrame of sheet ``rows`` under ``headers``; short rows are padded, long rows cut."""
+    if not rows:
+        return pd.DataFrame(columns=headers)
+    frame = pd.DataFrame(rows)
+    frame = frame.reindex(columns=range(len(headers)))
+    frame.columns = headers
+    return frame
+
+
+def typed_alarms(df_data_source):
+    """Typed ``TSLast``, ``TSActive``, ``Unit Alarm Occurance`` and ``Time_Difference_minutes`` columns."""
+    df = df_data_source.reindex(columns=SHEET_COLUMNS).copy()
     df['TSLast'] = pd.to_datetime(df['TSLast'], errors='coerce')
     df['TSActive'] = pd.to_datetime(df['TSActive'], errors='coerce')
-    invalid_rows = df[df['TSLast'].isna() | df['TSActive'].isna()]
-    if not invalid_rows.empty:
-        print("Invalid datetime rows found:", invalid_rows)
+    invalid = int((df['TSLast'].isna() | df['TSActive'].isna()).sum())
+    if invalid:
+        print(f"Invalid datetime rows found: {invalid}")
     df['Time_Difference_minutes'] = (df['TSLast'] - df['TSActive']).dt.total_seconds() / 60
-    df = df[['TSLast', 'TSActive','Unit Alarm Occurance', 'Time_Difference_minutes']]
+    return df
+
+
+class SheetsClient:
+    """Alarm rows from the plant's Google Sheet, read with one ``batchGet`` per refresh.
 
-   
-    return df_data_source
+    The first read (``since`` is ``None``) fetches the ``Alarm Summary`` and
+    ``Data Source`` ranges together; later reads only ask for the header row
+    and the ``Data Source`` rows below the last one read, so the sheet is
+    expected to be append-only. ``service`` may be any object with the
+    discovery client's ``spreadsheets().values().batchGet(...).execute()``
+    interface, such as a local fake; by default a cached client is built from
+    ``api_key``.
+    """
+
+    def __init__(self, spreadsheet_id, api_key=None, service=None, summary_range=RANGE_ALARM_SUMMARY,
+                 data_range=RANGE_DATA_SOURCE, last_column='ZZ'):
+        self.spreadsheet_id = spreadsheet_id
+        self.api_key = api_key
+        self._service = service
+        self.summary_range = summary_range
+        self.data_range = data_range
+        self.last_column = last_column
+        self.rows_read = 0
+        self.alarm_summary = pd.DataFrame()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('SPREADSHEET_ID'), api_key=os.getenv('GOOGLE_API_KEY'))
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = sheets_service(self.api_key)
+        return self._service
+
+    def batch_get(self, ranges):
+        """Values of each of ``ranges`` (lists of rows) from one ``batchGet`` call."""
+        request = self.service.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id, ranges=list(ranges), majorDimension='ROWS')
+        with stage('api_request'):
+            response = request.execute()
+        return [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
+
+    def _rows_range(self, first_row):
+        return f"'{self.data_range}'!A{first_row}:{self.last_column}"
+
+    def read(self, incremental=False):
+        """Typed ``Data Source`` rows: all of them, or only those added since the last read."""
+        with self._lock:
+            if incremental and self.rows_read:
+                # Row 1 is the header, so the first unread data row is rows_read + 2.
+                header, rows = self.batch_get([f"'{self.data_range}'!1:1", self._rows_range(self.rows_read + 2)])
+                headers = header[0] if header else []
+            else:
+                summary, data_source = self.batch_get([self.summary_range, self.data_range])
+                self.alarm_summary = rows_to_frame(summary[1:], summary[0]) if summary else pd.DataFrame()
+                self.rows_read = 0
+                headers, rows = (data_source[0], data_source[1:]) if data_source else ([], [])
+
+            count('rows_fetched', len(rows))
+            with stage('parse'):
+                df = typed_alarms(rows_to_frame(rows, headers))
+            self.rows_read += len(rows)
+            return df
+
+    def fetch(self, since=None):
+        """Normalized alarm rows for an ``AlarmStore``: a full read when ``since`` is ``None``, else new rows."""
+        df = self.read(incremental=since is not None)
+        return normalize_alarms(df.rename(columns=ALARM_COLUMNS))
+
+
+def fetch_data(API_KEY, SPREADSHEET_ID):
+    """Typed alarm rows of the whole ``Data Source`` sheet."""
+    return SheetsClient(SPREADSHEET_ID, api_key=API_KEY).read()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype('int64').astype('float64')
+    return values.astype('float64')
+
+
+def minmax_indices(y, n_out):
+    """Indices of the min and max sample in each of ``n_out // 2`` equal-count bins, in order.
+
+    The first and last samples are always kept so the plotted extent does not change.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    bins = max(n_out // 2, 1)
+    bin_ids = np.arange(n) * bins // n
+    values = pd.Series(_as_float(y))
+    lows = values.fillna(np.inf).groupby(bin_ids).idxmin().to_numpy()
+    highs = values.fillna(-np.inf).groupby(bin_ids).idxmax().to_numpy()
+    return np.unique(np.concatenate([[0], lows, highs, [n - 1]]))
+
+
+def lttb_indices(x, y, n_out):
+    """Indices chosen by Largest-Triangle-Three-Buckets downsampling to ``n_out`` points."""
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = np.nan_to_num(_as_float(y))
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    selected = np.empty(n_out, dtype='int64')
+    selected[0] = 0
+    selected[-1] = n - 1
+    anchor = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[anchor] - avg_x) * (y[lo:hi] - y[anchor]) - (x[anchor] - x[lo:hi]) * (avg_y - y[anchor]))
+        anchor = lo + int(np.argmax(area)) if hi > lo else lo
+        selected[i + 1] = anchor
+    return np.unique(selected)
+
+
+def downsample_indices(x, y, n_out, method='minmax'):
+    if method == 'lttb':
+        return lttb_indices(x, y, n_out)
+    if method == 'minmax':
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Unknown downsampling method: {method}")
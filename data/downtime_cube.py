@@ -0,0 +1,206 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data.normalize import concat_alarms, max_duration, overlapping_rows
+from data.timeline import downtime_buckets
+
+
+PERIODS = {
+    'hour': None,
+    'day': 'D',
+    'week': 'W-SUN',
+    'month': 'M',
+}
+
+GROUP_COLUMN = 'Equipment Group'
+
+
+def _empty_cells():
+    return pd.DataFrame({
+        'hour': pd.Series(dtype='datetime64[ns]'),
+        'alarm': pd.Series(dtype='category'),
+        'alarm_count': pd.Series(dtype='int64'),
+    })
+
+
+def _empty_downtime():
+    return pd.DataFrame({
+        'hour': pd.Series(dtype='datetime64[ns]'),
+        GROUP_COLUMN: pd.Series(dtype='object'),
+        'downtime_minutes': pd.Series(dtype='float64'),
+    })
+
+
+def aggregate_cells(df):
+    """Count alarms per (hour of ``tslast``, alarm)."""
+    if df.empty:
+        return _empty_cells()
+    alarms = df['alarm'] if isinstance(df['alarm'].dtype, pd.CategoricalDtype) else df['alarm'].astype('category')
+    cells = (
+        pd.DataFrame({'hour': df['tslast'].dt.floor('h'), 'alarm': alarms})
+        .groupby(['hour', 'alarm'], observed=True, sort=True)
+        .size()
+        .rename('alarm_count')
+        .reset_index()
+    )
+    cells['alarm_count'] = cells['alarm_count'].astype('int64')
+    return cells
+
+
+def hour_range(rows):
+    """Hours ``[start, end)`` touched by the alarm intervals of ``rows``."""
+    ends = rows['tslast']
+    starts = rows['tsactive'].fillna(ends)
+    return starts.min().floor('h'), ends.max().floor('h') + pd.Timedelta(hours=1)
+
+
+def aggregate_downtime(df, start, end, classify, longest=None):
+    """Merged downtime minutes per (hour, equipment group) for the hours ``[start, end)``.
+
+    Overlapping alarms of a group are counted once and alarms are split at
+    the hour edges they cross; hours without downtime are left out.
+    ``longest`` bounds the alarms' durations, as in ``overlapping_rows``.
+    """
+    window = overlapping_rows(df, start, end, max_duration=longest)
+    if window.empty:
+        return _empty_downtime()
+    window = window.assign(**{GROUP_COLUMN: classify(window['alarm'])})
+    buckets = downtime_buckets(window, start, end, GROUP_COLUMN)
+    buckets = buckets[buckets['downtime'] > 0]
+    return pd.DataFrame({
+        'hour': buckets['start'].to_numpy(),
+        GROUP_COLUMN: buckets['group'].astype(str).to_numpy(dtype=object),
+        'downtime_minutes': buckets['downtime'].to_numpy(),
+    }).sort_values('hour', kind='stable', ignore_index=True)
+
+
+def _hour_slice(frame, start, end):
+    lo, hi = np.searchsorted(frame['hour'].to_numpy(),
+                             [pd.Timestamp(start).to_datetime64(), pd.Timestamp(end).to_datetime64()])
+    return int(lo), int(hi)
+
+
+class DowntimeCube:
+    """Pre-aggregated downtime minutes per (hour, equipment group) and alarm counts per (hour, alarm).
+
+    Downtime is the merged, hour-split downtime of ``data.timeline.downtime_buckets``,
+    so trends agree with the daily timeline. It depends on the grouping, and
+    is rebuilt when ``grouping`` is reloaded. Alarm counts are kept per alarm by
+    the hour of ``tslast`` and get their equipment group at query time.
+    ``update`` recomputes only the hours that new rows touch.
+    """
+
+    def __init__(self, grouping, df=None):
+        self.grouping = grouping
+        self._cells = _empty_cells()
+        self._downtime = _empty_downtime()
+        self._df = None
+        self._longest = pd.Timedelta(0)
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        if df is not None:
+            self.rebuild(df)
+
+    def __len__(self):
+        return len(self._downtime) + len(self._cells)
+
+    def rebuild(self, df):
+        index = self.grouping.index
+        cells = aggregate_cells(df)
+        longest = max_duration(df)
+        downtime = aggregate_downtime(df, *hour_range(df), index.classify, longest) if not df.empty else _empty_downtime()
+        with self._lock:
+            self._df = df
+            self._longest = longest
+            self._fingerprint = index.fingerprint
+            self._cells = cells
+            self._downtime = downtime
+
+    def update(self, df, new_rows):
+        """Fold in ``new_rows`` of ``df``, the store's frame that already contains them."""
+        if new_rows.empty:
+            return
+        index = self.grouping.index
+        if index.fingerprint != self._fingerprint:
+            self.rebuild(df)
+            return
+        new_cells = aggregate_cells(new_rows)
+        start, end = hour_range(new_rows)
+        longest = max(self._longest, max_duration(new_rows))
+        new_downtime = aggregate_downtime(df, start, end, index.classify, longest)
+        with self._lock:
+            cells = self._cells
+            lo = cells['hour'].searchsorted(new_cells['hour'].iloc[0], side='left')
+            tail = concat_alarms([cells.iloc[lo:], new_cells])
+            tail = (
+                tail.groupby(['hour', 'alarm'], observed=True, sort=True)['alarm_count']
+                .sum()
+                .reset_index()
+            )
+            self._cells = concat_alarms([cells.iloc[:lo], tail])
+
+            downtime = self._downtime
+            lo, hi = _hour_slice(downtime, start, end)
+            self._downtime = pd.concat([downtime.iloc[:lo], new_downtime, downtime.iloc[hi:]], ignore_index=True)
+            self._df = df
+            self._longest = longest
+
+    def on_store_change(self, df, added):
+        """``AlarmStore`` listener: fold in ``added`` rows, or rebuild when the frame was replaced."""
+        if added is None:
+            self.rebuild(df)
+        else:
+            self.update(df, added)
+
+    def _current(self):
+        if self._df is not None and self.grouping.index.fingerprint != self._fingerprint:
+            self.rebuild(self._df)
+        with self._lock:
+            return self._cells, self._downtime
+
+    @staticmethod
+    def _in_shift(frame, start, end, shift_start, shift_end):
+        lo, hi = _hour_slice(frame, start, end)
+        frame = frame.iloc[lo:hi]
+        hour_of_day = frame['hour'].dt.hour
+        if shift_start <= shift_end:
+            in_shift = (hour_of_day >= shift_start) & (hour_of_day < shift_end)
+        else:
+            in_shift = (hour_of_day >= shift_start) | (hour_of_day < shift_end)
+        return frame[in_shift].copy()
+
+    def cells(self, start, end, shift_start=0, shift_end=24):
+        """Alarm count cells with ``start <= hour < end`` whose hour of day lies in ``[shift_start, shift_end)``.
+
+        A shift that ends before it starts (e.g. 22 to 6) wraps past midnight.
+        """
+        cells, _ = self._current()
+        cells = self._in_shift(cells, start, end, shift_start, shift_end)
+        cells[GROUP_COLUMN] = self.grouping.classify(cells['alarm'])
+        return cells
+
+    def downtime(self, start, end, shift_start=0, shift_end=24):
+        """Downtime cells with ``start <= hour < end`` whose hour of day lies in ``[shift_start, shift_end)``."""
+        _, downtime = self._current()
+        return self._in_shift(downtime, start, end, shift_start, shift_end)
+
+    def totals(self, start, end, by=('period', GROUP_COLUMN), period='day', shift_start=0, shift_end=24):
+        """Downtime minutes and alarm counts between ``start`` and ``end`` grouped by ``by``.
+
+        ``by`` may contain ``period`` (bucketed by ``period``: hour, day, week or
+        month), ``hour_of_day`` and ``Equipment Group``.
+        """
+        freq = PERIODS[period]
+        by = list(by)
+        frames = []
+        for frame, column in ((self.downtime(start, end, shift_start, shift_end), 'downtime_minutes'),
+                              (self.cells(start, end, shift_start, shift_end), 'alarm_count')):
+            frame['period'] = frame['hour'] if freq is None else frame['hour'].dt.to_period(freq).dt.start_time
+            frame['hour_of_day'] = frame['hour'].dt.hour
+            frame[GROUP_COLUMN] = frame[GROUP_COLUMN].astype(str)
+            frames.append(frame.groupby(by, sort=True)[column].sum())
+        totals = pd.concat(frames, axis=1).fillna(0).sort_index().reset_index()
+        totals['alarm_count'] = totals['alarm_count'].astype('int64')
+        return totals[by + ['downtime_minutes', 'alarm_count']]
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+UNKNOWN_GROUP = 'Unknown'
+
+
+class EquipmentGroupIndex:
+    """Inverted alarm -> equipment group index built once from a grouping dict.
+
+    When an alarm is listed under several groups the first group wins, as with
+    the original linear scan. Alarms that are not listed are classified as
+    ``UNKNOWN_GROUP``; ``count_unknown`` counts their rows in ``unknown_alarms``.
+    """
+
+    def __init__(self, grouping):
+        self.grouping = grouping
+        self.groups = pd.Index(list(grouping) + [UNKNOWN_GROUP])
+        self.fingerprint = hashlib.sha1(json.dumps(grouping, sort_keys=True).encode()).hexdigest()
+        self.unknown_alarms = Counter()
+
+        alarm_to_group = {}
+        for code, alarms in enumerate(grouping.values()):
+            for alarm in alarms:
+                alarm_to_group.setdefault(alarm, code)
+        self.alarms = pd.Index(list(alarm_to_group))
+        unknown_code = len(self.groups) - 1
+        self._group_codes = np.append(np.fromiter(alarm_to_group.values(), dtype='int64', count=len(alarm_to_group)),
+                                      unknown_code)
+
+    def __len__(self):
+        return len(self.alarms)
+
+    def lookup(self, alarm):
+        position = self.alarms.get_indexer([alarm])[0]
+        return self.groups[self._group_codes[position]]
+
+    def classify(self, alarms):
+        """Map a column of alarm names to a categorical of equipment groups."""
+        alarms = pd.Series(alarms)
+        if isinstance(alarms.dtype, pd.CategoricalDtype):
+            positions = self.alarms.get_indexer(alarms.cat.categories)
+            codes = alarms.cat.codes.to_numpy()
+            positions = np.where(codes >= 0, positions[codes], -1)
+        else:
+            positions = self.alarms.get_indexer(alarms)
+
+        group_codes = self._group_codes[positions]
+        return pd.Series(pd.Categorical.from_codes(group_codes, self.groups), index=alarms.index)
+
+    def count_unknown(self, alarms, reset=False):
+        """Add the rows of ``alarms`` that are not listed to ``unknown_alarms``; ``reset`` starts the counts over.
+
+        Each distinct unknown alarm is logged the first time it is seen.
+        """
+        counts = pd.Series(alarms).value_counts(dropna=False)
+        counts = counts[(counts > 0) & (self.alarms.get_indexer(counts.index) < 0)]
+        counts.index = counts.index.astype(object).fillna('')
+        if reset:
+            self.unknown_alarms = Counter()
+        new_alarms = [alarm for alarm in counts.index if alarm not in self.unknown_alarms]
+        self.unknown_alarms.update(counts.to_dict())
+        if new_alarms:
+            print(f"Unknown alarms classified as '{UNKNOWN_GROUP}': {', '.join(map(str, new_alarms))}")
+
+
+def load_grouping(path):
+    """Read an equipment grouping (``{"group": ["alarm", ...]}``) from a JSON file."""
+    with open(path) as f:
+        grouping = json.load(f)
+    if not isinstance(grouping, dict) or not all(isinstance(alarms, list) for alarms in grouping.values()):
+        raise ValueError(f"{path} must map equipment group names to lists of alarms")
+    return grouping
+
+
+class EquipmentGrouping:
+    """Equipment grouping that can be hot-reloaded from a JSON config file.
+
+    The file's modification time is checked at most every ``check_interval``
+    seconds; when it changes a new index is built and swapped in whole, so
+    readers always see either the old or the new index. If the file is
+    missing or invalid the previous index is kept.
+
+    Register ``on_store_change`` with ``AlarmStore.add_listener`` to count
+    the store's alarms that the grouping does not list, once per refresh
+    rather than on every classification.
+    """
+
+    def __init__(self, default_grouping, path=None, check_interval=5):
+        self.path = path
+        self.check_interval = check_interval
+        self._index = EquipmentGroupIndex(default_grouping)
+        self._mtime = None
+        self._last_check = 0.0
+        self._df = None
+        self._lock = threading.Lock()
+        if path:
+            self.reload_if_changed(force=True)
+
+    @classmethod
+    def from_env(cls, default_grouping):
+        return cls(default_grouping, path=os.getenv('EQUIPMENT_GROUPING_FILE') or None)
+
+    @property
+    def index(self):
+        if self.path and time.monotonic() - self._last_check >= self.check_interval:
+            self.reload_if_changed()
+        return self._index
+
+    def classify(self, alarms):
+        return self.index.classify(alarms)
+
+    @property
+    def unknown_alarms(self):
+        """Rows of the store per alarm name that the grouping does not list."""
+        return dict(self._index.unknown_alarms)
+
+    def on_store_change(self, df, added):
+        self._df = df
+        if added is None:
+            self.index.count_unknown(df['alarm'], reset=True)
+        elif not added.empty:
+            self.index.count_unknown(added['alarm'])
+
+    def reload_if_changed(self, force=False):
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if not force and mtime == self._mtime:
+                    return False
+                index = EquipmentGroupIndex(load_grouping(self.path))
+            except (OSError, ValueError) as e:
+                print(f"Error loading equipment grouping from {self.path}: {str(e)}")
+                return False
+            self._mtime = mtime
+            if self._df is not None:
+                index.count_unknown(self._df['alarm'])
+            self._index = index
+            print(f'Equipment grouping loaded from {self.path}: {len(index)} alarms in {len(index.groups) - 1} groups')
+            return True
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from data.instrumentation import count, stage
+
+
+class FigureCache:
+    """LRU cache of built figures, optionally shared between workers on disk.
+
+    Figures are stored as their JSON-decoded dicts, which Dash can return
+    as-is. With a ``directory`` every entry is also written as a JSON file,
+    so other workers can serve it without rebuilding. Keys must be tuples of
+    strings or numbers that identify both the view and the data it was
+    built from.
+    """
+
+    def __init__(self, max_entries=32, directory=None, max_files=256):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_files = max_files
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, partition=None):
+        """Cache configured from the environment; ``partition`` gets its own subdirectory."""
+        directory = os.getenv('FIGURE_CACHE_DIR') or None
+        if directory and partition:
+            directory = os.path.join(directory, partition)
+        return cls(
+            max_entries=int(os.getenv('FIGURE_CACHE_SIZE', '32')),
+            directory=directory,
+        )
+
+    def _filename(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        figure = self._read_file(key) if self.directory else None
+        with self._lock:
+            if figure is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, figure)
+        return figure
+
+    def set(self, key, figure):
+        """Cache ``figure`` (a ``go.Figure``, figure dict or JSON string) and return its dict form."""
+        with stage('serialize'):
+            figure_json = figure if isinstance(figure, str) else pio.to_json(figure, validate=False)
+            cached = json.loads(figure_json)
+        count('figure_bytes', len(figure_json))
+        with self._lock:
+            self._remember(key, cached)
+        if self.directory:
+            self._write_file(key, figure_json)
+        return cached
+
+    def get_or_create(self, key, create):
+        figure = self.get(key)
+        count('figure_cache_hits' if figure is not None else 'figure_cache_misses')
+        if figure is None:
+            figure = self.set(key, create())
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, figure):
+        self._entries[key] = figure
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_file(self, key):
+        try:
+            with open(self._filename(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_file(self, key, figure_json):
+        filename = self._filename(key)
+        tmp_filename = f'{filename}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_filename, 'w') as f:
+                f.write(figure_json)
+            os.replace(tmp_filename, filename)
+            self._prune_files()
+        except OSError as e:
+            print(f"Error writing figure cache entry: {str(e)}")
+
+    def _prune_files(self):
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
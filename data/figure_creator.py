@@ -1,69 +1,75 @@
 import pandas as pd
 import plotly.graph_objects as go
+from data.timeline import build_timeline
 
-def create_figure(start_date, end_date):
-    mask = (df['TSLast'] >= start_date) & (df['TSLast'] <= end_date)
-    filtered_df = df[mask]
-    alarm_downtime_totals = filtered_df.groupby('Alarm')['Time_Difference_minutes'].sum().reset_index()
-    alarm_downtime_totals = alarm_downtime_totals.sort_values('Time_Difference_minutes', ascending=False)
-    filtered_df['Alarm'] = pd.Categorical(filtered_df['Alarm'], categories=alarm_downtime_totals['Alarm'], ordered=True)
-    filtered_df = filtered_df.sort_values('Alarm', ascending=False)
-    filtered_df['TSLast'] = pd.to_datetime(filtered_df['TSLast'])
+def state_bar_traces(name, color, y, x, base, customdata, hovertemplate, width, packed=True):
+    """Build the horizontal bars of one state (Good State or Active Alarm).
+
+    With ``packed`` all segments go into a single array-backed trace sharing one
+    ``hovertemplate``; otherwise one single-bar trace is built per segment.
+    """
+    if packed:
+        return [go.Bar(
+            y=list(y),
+            x=list(x),
+            base=list(base),
+            customdata=list(customdata),
+            width=width,
+            orientation='h',
+            name=name,
+            marker_color=color,
+            hovertemplate=hovertemplate,
+            showlegend=False
+        )]
+    return [
+        go.Bar(
+            y=[y_value],
+            x=[x_value],
+            base=base_value,
+            customdata=[row],
+            width=width,
+            orientation='h',
+            name=name,
+            marker_color=color,
+            hovertemplate=hovertemplate,
+            showlegend=False
+        )
+        for y_value, x_value, base_value, row in zip(y, x, base, customdata)
+    ]
+
+
+def create_figure(start_date, end_date, df, packed=True):
+    segments = build_timeline(df, start_date, end_date, 'Alarm', time_col='TSLast', active_col='TSActive',
+                              value_col='Time_Difference_minutes', alarm_col='Alarm')
     time_range = pd.date_range(start=start_date, end=end_date, freq='h')
-    alarms = filtered_df['Alarm'].unique()
     fig = go.Figure()
 
     bar_width = 0.65
 
-    for alarm in alarms:
-        alarm_data = filtered_df[filtered_df['Alarm'] == alarm]
-        last_time = pd.Timestamp(start_date)
-
-        for hour in time_range:
-            downtime_segment = alarm_data[(alarm_data['TSLast'] >= last_time) & (alarm_data['TSLast'] < hour)]
-            downtime_total = downtime_segment['Time_Difference_minutes'].sum()
+    base = segments['start'].dt.hour * 60 + segments['start'].dt.minute
+    down = segments['downtime'] > 0
+    good_customdata = [
+        [f'Start Time: {start_time} <br>Alarm:  {alarm}  ', f'{round(active_time, 2)}minutes'] if has_downtime
+        else [f'Alarm: {alarm}', f'{round(active_time, 2)} minutes']
+        for alarm, start_time, active_time, has_downtime
+        in zip(segments['group'], segments['first_tsactive'], segments['active'], down)
+    ]
+    alarm_customdata = [
+        [str(start_time), f'{round(downtime_total, 2)}']
+        for start_time, downtime_total in zip(segments['first_tsactive'][down], segments['downtime'][down])
+    ]
 
-            if downtime_total > 0:
-                if (hour - last_time).total_seconds() / 60 > 0:
-                    active_time = (hour - last_time).total_seconds() / 60 - downtime_total
-                    start_time = downtime_segment['TSActive'].iloc[0] if not downtime_segment.empty else last_time
-                    fig.add_trace(go.Bar(
-                        y=[alarm],
-                        x=[active_time],
-                        width=bar_width,
-                        orientation='h',
-                        name='Good State',
-                        marker_color='lightgreen',
-                        base=last_time.hour * 60 + last_time.minute,
-                        hovertemplate=f'Start Time: {start_time} <br>Alarm:  {alarm}  <br>Type: Good State<br>Duration: {round(active_time, 2)}minutes<extra></extra>',
-                        showlegend=False  
-                    ))
-                    fig.add_trace(go.Bar(
-                        y=[alarm],
-                        x=[downtime_total],
-                        width=bar_width,
-                        orientation='h',
-                        name='Active Alarm',
-                        marker_color='red',
-                        base=last_time.hour * 60 + last_time.minute + active_time,
-                        hovertemplate=f'Start Time: {start_time} <br>Alarm: {alarm}<br>Type: Active Alarm<br>Duration: {round(downtime_total, 2)} minutes<extra></extra>',
-                        showlegend=False  
-                    ))
-                last_time = hour
-
-        if last_time < time_range[-1]:
-            remaining_time = (time_range[-1] - last_time).total_seconds() / 60
-            fig.add_trace(go.Bar(
-                y=[alarm],
-                x=[remaining_time],
-                width=bar_width,
-                orientation='h',
-                name='Good State',
-                marker_color='lightgreen',
-                base=last_time.hour * 60 + last_time.minute,
-                hovertemplate='Alarm: ' + alarm + '<br>Type: Good State<br>Duration: ' + str(round(remaining_time, 2)) + ' minutes<extra></extra>',
-                showlegend= False
-            ))
+    fig.add_traces(state_bar_traces(
+        'Good State', 'lightgreen', segments['group'], segments['active'], base, good_customdata,
+        '%{customdata[0]}<br>Type: Good State<br>Duration: %{customdata[1]}<extra></extra>',
+        bar_width, packed
+    ))
+    fig.add_traces(state_bar_traces(
+        'Active Alarm', 'red', segments['group'][down], segments['downtime'][down],
+        base[down] + segments['active'][down], alarm_customdata,
+        'Start Time: %{customdata[0]} <br>Alarm: %{y}<br>Type: Active Alarm<br>Duration: %{customdata[1]} minutes<extra></extra>',
+        bar_width, packed
+    ))
 
     fig.update_layout(
         title="Active Alarm and Good State Duration by Alarm",
@@ -78,7 +84,7 @@ def create_figure(start_date, end_date):
             showgrid=True,
             title_font_size=12
         ),
-        yaxis=dict(tickfont=dict(size=10)),
+        yaxis=dict(tickfont=dict(size=10), categoryorder='array', categoryarray=list(segments['group'].cat.categories)),
        # plot_bgcolor='#36454F',
        # paper_bgcolor='#36454F',
         font=dict(color='white')
@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_local = threading.local()
+
+
+class RequestTrace:
+    """Stage timings and counters collected while one request runs."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now()
+        self.stages = defaultdict(float)
+        self.stage_calls = defaultdict(int)
+        self.counts = defaultdict(int)
+        self.seconds = None
+        self.peak_memory = None
+        self.error = None
+
+    def as_dict(self):
+        return {
+            'request': self.name,
+            'started_at': self.started_at.isoformat(),
+            'seconds': self.seconds,
+            'stages': dict(self.stages),
+            'counts': dict(self.counts),
+            'peak_memory_bytes': self.peak_memory,
+            'error': self.error,
+        }
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def stage(name):
+    """Time a stage of the current request; does nothing outside a request.
+
+    Stages with the same name in one request are added up.
+    """
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.stages[name] += time.perf_counter() - started
+        trace.stage_calls[name] += 1
+
+
+def count(name, value=1):
+    """Add ``value`` to a counter (rows, traces, bytes, ...) of the current request."""
+    trace = current_trace()
+    if trace is not None:
+        trace.counts[name] += int(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class Instrumentation:
+    """Aggregate request traces into Prometheus metrics and structured slow-request logs.
+
+    Wrap each request in ``request(name)``; code it calls marks stages with
+    ``stage`` and ``count`` from this module. With ``trace_memory`` the peak
+    memory traced by ``tracemalloc`` during each request is recorded too.
+    Tracing slows every allocation and ``tracemalloc`` is process-wide, so
+    peaks of concurrent requests overlap. Requests slower than
+    ``slow_seconds`` are printed as one JSON line.
+    """
+
+    def __init__(self, namespace='equipment_dash', slow_seconds=1.0, trace_memory=False, history=50):
+        self.namespace = namespace
+        self.slow_seconds = slow_seconds
+        self.trace_memory = trace_memory
+        self.recent = deque(maxlen=history)
+        self.gauges = {}
+
+        self._requests = defaultdict(lambda: [0] * (len(REQUEST_BUCKETS) + 1))
+        self._request_seconds = defaultdict(float)
+        self._stage_seconds = defaultdict(float)
+        self._stage_calls = defaultdict(int)
+        self._counts = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._slow = defaultdict(int)
+        self._peak_memory = {}
+        self._lock = threading.Lock()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_env(cls):
+        trace_memory = os.getenv('TRACE_MEMORY', '').strip().lower() in ('1', 'true', 'yes', 'on')
+        return cls(slow_seconds=float(os.getenv('SLOW_REQUEST_SECONDS', '1.0')), trace_memory=trace_memory)
+
+    def add_gauge(self, name, help_text, read, **labels):
+        """Export ``read()`` as the gauge ``<namespace>_<name>{labels}`` on every scrape."""
+        self.gauges[name, tuple(sorted(labels.items()))] = (help_text, read)
+
+    @contextmanager
+    def request(self, name):
+        """Trace a request on this thread. Nested calls join the outer request."""
+        if current_trace() is not None:
+            yield current_trace()
+            return
+        trace = RequestTrace(name)
+        _local.trace = trace
+        memory_base = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memory_base = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield trace
+        except Exception as e:
+            trace.error = str(e)
+            raise
+        finally:
+            trace.seconds = time.perf_counter() - started
+            if memory_base is not None:
+                trace.peak_memory = max(tracemalloc.get_traced_memory()[1] - memory_base, 0)
+            _local.trace = None
+            self.record(trace)
+
+    def record(self, trace):
+        with self._lock:
+            buckets = self._requests[trace.name]
+            for position, bound in enumerate(REQUEST_BUCKETS):
+                if trace.seconds <= bound:
+                    buckets[position] += 1
+            buckets[-1] += 1
+            self._request_seconds[trace.name] += trace.seconds
+            for stage_name, seconds in trace.stages.items():
+                self._stage_seconds[trace.name, stage_name] += seconds
+                self._stage_calls[trace.name, stage_name] += trace.stage_calls[stage_name]
+            for counter, value in trace.counts.items():
+                self._counts[trace.name, counter] += value
+            if trace.error is not None:
+                self._errors[trace.name] += 1
+            if trace.peak_memory is not None:
+                self._peak_memory[trace.name] = trace.peak_memory
+            slow = trace.seconds >= self.slow_seconds
+            if slow:
+                self._slow[trace.name] += 1
+            self.recent.appendleft(trace.as_dict())
+        if slow:
+            print(json.dumps({'event': 'slow_request', **trace.as_dict()}), flush=True)
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        ns = self.namespace
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f'# HELP {ns}_{name} {help_text}')
+            lines.append(f'# TYPE {ns}_{name} {kind}')
+
+        with self._lock:
+            metric('request_seconds', 'histogram', 'Time spent handling a request.')
+            for request, buckets in sorted(self._requests.items()):
+                for bound, value in zip(REQUEST_BUCKETS, buckets):
+                    lines.append(f'{ns}_request_seconds_bucket{_labels(request=request, le=bound)} {value}')
+                lines.append(f'{ns}_request_seconds_bucket{_labels(request=request, le="+Inf")} {buckets[-1]}')
+                lines.append(f'{ns}_request_seconds_sum{_labels(request=request)} {self._request_seconds[request]}')
+                lines.append(f'{ns}_request_seconds_count{_labels(request=request)} {buckets[-1]}')
+
+            metric('stage_seconds', 'summary', 'Time spent in each stage of a request.')
+            for (request, stage_name), seconds in sorted(self._stage_seconds.items()):
+                labels = _labels(request=request, stage=stage_name)
+                lines.append(f'{ns}_stage_seconds_sum{labels} {seconds}')
+                lines.append(f'{ns}_stage_seconds_count{labels} {self._stage_calls[request, stage_name]}')
+
+            metric('items_total', 'counter', 'Rows, traces and bytes processed by requests.')
+            for (request, counter), value in sorted(self._counts.items()):
+                lines.append(f'{ns}_items_total{_labels(request=request, item=counter)} {value}')
+
+            metric('request_errors_total', 'counter', 'Requests that raised an exception.')
+            for request, value in sorted(self._errors.items()):
+                lines.append(f'{ns}_request_errors_total{_labels(request=request)} {value}')
+
+            metric('slow_requests_total', 'counter', f'Requests slower than {self.slow_seconds} seconds.')
+            for request, value in sorted(self._slow.items()):
+                lines.append(f'{ns}_slow_requests_total{_labels(request=request)} {value}')
+
+            if self._peak_memory:
+                metric('request_peak_memory_bytes', 'gauge', 'Peak traced memory of the last request.')
+                for request, value in sorted(self._peak_memory.items()):
+                    lines.append(f'{ns}_request_peak_memory_bytes{_labels(request=request)} {value}')
+
+        described = set()
+        for (name, labels), (help_text, read) in sorted(self.gauges.items()):
+            try:
+                value = read()
+            except Exception as e:
+                print(f"Error reading gauge {name}: {str(e)}")
+                continue
+            if value is None:
+                continue
+            if name not in described:
+                metric(name, 'gauge', help_text)
+                described.add(name)
+            lines.append(f'{ns}_{name}{_labels(**dict(labels)) if labels else ""} {float(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def request_context(instrumentation, name):
+    """``instrumentation.request(name)``, or a no-op context when ``instrumentation`` is ``None``."""
+    return instrumentation.request(name) if instrumentation is not None else nullcontext()
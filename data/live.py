@@ -0,0 +1,158 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data.normalize import overlapping_rows
+from data.timeline import alarm_intervals
+
+
+def _cover(starts, ends, start, end):
+    """Add ``[start, end)`` to sorted disjoint intervals in place; return the parts that were not yet covered."""
+    first = bisect_left(ends, start)
+    last = bisect_right(starts, end)
+    gaps = []
+    cursor = start
+    for position in range(first, last):
+        if starts[position] > cursor:
+            gaps.append((cursor, starts[position]))
+        cursor = max(cursor, ends[position])
+    if cursor < end:
+        gaps.append((cursor, end))
+    if first < last:
+        start, end = min(start, starts[first]), max(end, ends[last - 1])
+    starts[first:last] = [start]
+    ends[first:last] = [end]
+    return gaps
+
+
+class LiveTimeline:
+    """Downtime of each equipment group within one window, grown as alarm rows arrive.
+
+    Each group's downtime is kept as sorted, disjoint intervals. Rows are
+    applied in ``tslast`` order and each adds only the parts of its alarm not
+    already covered, as pieces tagged with the row's ``tslast``. The store
+    only ever receives rows at or after its high-water mark, so the pieces
+    tagged after a given ``tslast`` are the same in every worker that holds
+    the same rows: a client that has drawn everything up to ``mark`` can be
+    sent just the pieces after it by any worker. ``rows_through(mark)`` lets
+    a worker check that it agrees with the client about the rows up to
+    ``mark``; a late row with an older ``tslast`` changes that count.
+    """
+
+    def __init__(self, start, end, classify, df=None, max_duration=None):
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.classify = classify
+        self._tags = []
+        self._piece_tags = []
+        self._pieces = []
+        self._covered = {}
+        self._first_tag = {}
+        self._lock = threading.Lock()
+        if df is not None and not df.empty:
+            self.apply(overlapping_rows(df, self.start, self.end, max_duration=max_duration))
+
+    def apply(self, rows):
+        """Add alarm rows (new or changed); returns the number of new pieces."""
+        if rows is None or rows.empty:
+            return 0
+        rows = rows.assign(**{'Equipment Group': self.classify(rows['alarm'])})
+        positions, groups, starts, ends = alarm_intervals(rows, 'Equipment Group')
+        order = np.argsort(ends, kind='stable')
+        window_start, window_end = self.start.value, self.end.value
+        alarms = rows['alarm'].to_numpy()[positions][order]
+        added = 0
+        with self._lock:
+            for group, alarm, tag, start, end in zip(groups.astype(str)[order], alarms, ends[order].tolist(),
+                                                     starts[order].tolist(), ends[order].tolist()):
+                start, end = max(start, window_start), min(end, window_end)
+                if end <= start:
+                    continue
+                insort(self._tags, tag)
+                self._first_tag[group] = min(self._first_tag.get(group, tag), tag)
+                for gap_start, gap_end in _cover(*self._covered.setdefault(group, ([], [])), start, end):
+                    position = bisect_right(self._piece_tags, tag)
+                    self._piece_tags.insert(position, tag)
+                    self._pieces.insert(position, (group, pd.Timestamp(gap_start), pd.Timestamp(gap_end), str(alarm)))
+                    added += 1
+        return added
+
+    def state(self):
+        """``(mark, rows)``: the newest ``tslast`` applied (ns, or ``None``) and the number of rows applied."""
+        with self._lock:
+            return (self._tags[-1] if self._tags else None), len(self._tags)
+
+    def rows_through(self, mark):
+        with self._lock:
+            return bisect_right(self._tags, mark)
+
+    def pieces(self, after=None, through=None):
+        """Pieces tagged in ``(after, through]`` and the groups whose first piece is among them."""
+        with self._lock:
+            lo = 0 if after is None else bisect_right(self._piece_tags, after)
+            hi = len(self._pieces) if through is None else bisect_right(self._piece_tags, through)
+            pieces = self._pieces[lo:hi]
+            first_tag = dict(self._first_tag)
+        new_groups = [group for group in dict.fromkeys(group for group, _, _, _ in pieces)
+                      if after is None or first_tag[group] > after]
+        return pieces, new_groups
+
+    def downtime_minutes(self):
+        """Total downtime per group, counting overlapping alarms once."""
+        with self._lock:
+            return {group: sum(end - start for start, end in zip(*covered)) / 60e9
+                    for group, covered in self._covered.items()}
+
+
+class LiveTimelines:
+    """Live timelines of one alarm store, by window, kept current by the store's listener.
+
+    Register ``on_store_change`` with ``AlarmStore.add_listener``. Only the
+    ``max_windows`` most recently requested windows are kept, and a reloaded
+    equipment grouping starts new timelines. ``key`` identifies a timeline's
+    window and grouping the same way in every worker.
+    """
+
+    def __init__(self, store, grouping, max_windows=4):
+        self.store = store
+        self.grouping = grouping
+        self.max_windows = max_windows
+        self._timelines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, start, end):
+        return f'{pd.Timestamp(start).isoformat()}/{pd.Timestamp(end).isoformat()}/{self.grouping.index.fingerprint}'
+
+    def get(self, start, end):
+        index = self.grouping.index
+        key = self.key(start, end)
+        with self._lock:
+            timeline = self._timelines.get(key)
+            if timeline is not None:
+                self._timelines.move_to_end(key)
+                return timeline
+        timeline = LiveTimeline(start, end, index.classify, self.store.get(), self.store.max_duration)
+        with self._lock:
+            timeline = self._timelines.setdefault(key, timeline)
+            self._timelines.move_to_end(key)
+            while len(self._timelines) > self.max_windows:
+                self._timelines.popitem(last=False)
+        return timeline
+
+    def on_store_change(self, df, added):
+        with self._lock:
+            timelines = list(self._timelines.items())
+        if added is None:
+            # A replaced frame (a snapshot written by another worker) rebuilds the timelines; their pieces
+            # depend only on the rows, so clients that drew the old ones carry on.
+            for key, timeline in timelines:
+                rebuilt = LiveTimeline(timeline.start, timeline.end, timeline.classify, df, self.store.max_duration)
+                with self._lock:
+                    if key in self._timelines:
+                        self._timelines[key] = rebuilt
+            return
+        for _, timeline in timelines:
+            timeline.apply(overlapping_rows(added, timeline.start, timeline.end))
@@ -0,0 +1,116 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+TIME_COLUMNS = ['tslast', 'tsactive']
+CATEGORY_COLUMNS = ['alarm', 'Equipment Group']
+FLOAT_COLUMNS = ['time_difference_minutes']
+
+
+def empty_alarm_frame():
+    return pd.DataFrame({
+        'tslast': pd.Series(dtype='datetime64[ns]'),
+        'tsactive': pd.Series(dtype='datetime64[ns]'),
+        'alarm': pd.Series(dtype='category'),
+        'time_difference_minutes': pd.Series(dtype='float32'),
+    })
+
+
+def normalize_alarms(df, classify=None):
+    """Turn raw alarm rows into a typed frame sorted by ``tslast``.
+
+    Timestamps are parsed to ``datetime64``, ``alarm`` becomes a categorical
+    and ``time_difference_minutes`` is downcast to float32. Rows without a
+    valid ``tslast`` are dropped. When ``classify`` is given it is used to add
+    a categorical ``Equipment Group`` column.
+    """
+    if df.empty:
+        return empty_alarm_frame()
+
+    df = df.copy()
+    for column in TIME_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+    for column in FLOAT_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float32')
+    if 'alarm' in df:
+        df['alarm'] = df['alarm'].astype('category')
+        if classify is not None:
+            df['Equipment Group'] = classify(df['alarm'])
+
+    df = df[df['tslast'].notna()]
+    if df['tslast'].is_monotonic_increasing:
+        return df.reset_index(drop=True)
+    return df.sort_values('tslast', kind='stable', ignore_index=True)
+
+
+def concat_alarms(frames, sort=True):
+    """Concatenate normalized alarm frames, keeping categoricals (and ``tslast`` order unless ``sort`` is off)."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return empty_alarm_frame()
+    if len(frames) == 1:
+        return frames[0]
+
+    for column in CATEGORY_COLUMNS:
+        if all(isinstance(frame.get(column, pd.Series()).dtype, pd.CategoricalDtype) for frame in frames):
+            categories = union_categoricals([frame[column] for frame in frames]).categories
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+
+    merged = pd.concat(frames, ignore_index=True)
+    if sort and 'tslast' in merged and not merged['tslast'].is_monotonic_increasing:
+        merged = merged.sort_values('tslast', kind='stable', ignore_index=True)
+    return merged
+
+
+def window_bounds(df, start, end, column='tslast'):
+    """Positions of the rows with ``start <= column < end`` in a frame sorted by ``column``."""
+    values = df[column].to_numpy()
+    bounds = np.array([pd.Timestamp(start).to_datetime64(), pd.Timestamp(end).to_datetime64()],
+                      dtype=values.dtype)
+    lo, hi = np.searchsorted(values, bounds, side='left')
+    return int(lo), int(hi)
+
+
+def max_duration(df, start_column='tsactive', end_column='tslast'):
+    """Longest ``end_column - start_column`` of the rows (zero for none); a missing start is treated as the end."""
+    if df.empty:
+        return pd.Timedelta(0)
+    ends = df[end_column]
+    longest = (ends - df[start_column].fillna(ends)).max()
+    return max(longest, pd.Timedelta(0)) if pd.notna(longest) else pd.Timedelta(0)
+
+
+def overlapping_rows(df, start, end, start_column='tsactive', end_column='tslast', max_duration=None):
+    """Rows whose ``[start_column, end_column)`` interval overlaps ``[start, end)``.
+
+    The frame must be sorted by ``end_column``; rows ending before ``start``
+    are skipped by binary search. ``max_duration``, an upper bound on the
+    rows' durations such as ``AlarmStore.max_duration``, bounds the search
+    on the other side too: rows ending after ``end + max_duration`` start
+    after ``end``. Without it every row after ``start`` is scanned. A
+    missing start is treated as the end.
+    """
+    if df.empty:
+        return df
+    if max_duration is None:
+        lo, _ = window_bounds(df, start, start, end_column)
+        tail = df.iloc[lo:]
+    else:
+        lo, hi = window_bounds(df, start, pd.Timestamp(end) + max_duration, end_column)
+        tail = df.iloc[lo:hi]
+    ends = tail[end_column]
+    starts = tail[start_column].fillna(ends)
+    return tail[(ends > pd.Timestamp(start)) & (starts < pd.Timestamp(end))]
+
+
+def frame_fingerprint(window):
+    """Digest of a frame's rows; changes only when those rows change."""
+    digest = hashlib.sha1(str(len(window)).encode())
+    if not window.empty:
+        digest.update(pd.util.hash_pandas_object(window, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
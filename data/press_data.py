@@ -1,51 +1,102 @@
+import os
 import pandas as pd
 import sqlite3
-from io import BytesIO
+import tempfile
 import base64
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from datetime import datetime
+from data.downsample import downsample_indices
+from data.instrumentation import count, stage
 
 
+MAX_POINTS_PER_TRACE = int(os.getenv('TREND_MAX_POINTS', '4000'))
+WEBGL_THRESHOLD = int(os.getenv('TREND_WEBGL_THRESHOLD', '20000'))
 
-def convert_micro_to_datetime(ts):
-    """Convert timestamp from microseconds to a human-readable datetime format."""
-    return datetime.utcfromtimestamp(ts / 1e6).strftime('%Y-%m-%d %H:%M:%S')
 
-def convert_to_pressure(raw_value):
-    """Convert raw pressure values to human-readable format."""
+TREND_QUERY = """
+SELECT TS, Val1, Val2, Val3
+FROM TblTrendData
+"""
+
+VALUE_COLUMNS = {
+    'Val1': 'Extrusion Time',
+    'Val2': 'Dead Cycle Time',
+    'Val3': 'Full Cycle Time',
+}
+
+
+def open_sqlite_bytes(data):
+    """Open an SQLite database held in memory as bytes."""
+    conn = sqlite3.connect(':memory:')
+    if hasattr(conn, 'deserialize'):
+        conn.deserialize(data)
+        return conn, None
+    # sqlite3.Connection.deserialize needs Python 3.11; fall back to a temp file.
+    conn.close()
+    tmp = tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False)
+    with tmp:
+        tmp.write(data)
+    return sqlite3.connect(tmp.name), tmp.name
+
+
+def convert_trend_chunk(chunk):
+    """Add ``Timestamp`` (``TS`` in microseconds, to the second) and the pressures (raw values / 1e6, missing as 0)."""
+    chunk['Timestamp'] = pd.to_datetime(chunk['TS'], unit='us').dt.floor('s')
     scaling_factor = 1e6
-    return raw_value / scaling_factor if pd.notnull(raw_value) else 0.0
+    for raw_column, column in VALUE_COLUMNS.items():
+        chunk[column] = chunk[raw_column].to_numpy(dtype='float64', na_value=0.0) / scaling_factor
+    return chunk
+
 
-def fetch_all_data_from_uploaded_file(contents):
+def fetch_all_data_from_uploaded_file(contents, chunksize=250000):
     """Fetch and process data from the uploaded SQLite file."""
     content_type, content_string = contents.split(',')
 
     
-    decoded = base64.b64decode(content_string)
-
-    
-    buffer = BytesIO(decoded)
-
-    
-    with sqlite3.connect(f"file::memory:?cache=shared", uri=True) as conn:
-        conn = sqlite3.connect(buffer)
-        query = """
-        SELECT TS, Val1, Val2, Val3
-        FROM TblTrendData
-        """
-        df = pd.read_sql_query(query, conn)
-
-    # Convert timestamp and values
-    df['Timestamp'] = df['TS'].apply(convert_micro_to_datetime)
-    df['Extrusion Time'] = df['Val1'].apply(convert_to_pressure)
-    df['Dead Cycle Time'] = df['Val2'].apply(convert_to_pressure)
-    df['Full Cycle Time'] = df['Val3'].apply(convert_to_pressure)
-
+    with stage('decode'):
+        decoded = base64.b64decode(content_string)
+
+    conn, tmp_path = open_sqlite_bytes(decoded)
+    try:
+        with stage('sqlite_read'):
+            chunks = [convert_trend_chunk(chunk) for chunk in pd.read_sql_query(TREND_QUERY, conn, chunksize=chunksize)]
+    finally:
+        conn.close()
+        if tmp_path is not None:
+            os.remove(tmp_path)
+
+    if not chunks:
+        return convert_trend_chunk(pd.DataFrame(columns=['TS', 'Val1', 'Val2', 'Val3']))
+    df = pd.concat(chunks, ignore_index=True)
+    if not df['Timestamp'].is_monotonic_increasing:
+        with stage('sort'):
+            df = df.sort_values('Timestamp', kind='stable', ignore_index=True)
+    count('rows', len(df))
     return df
 
-def create_plot(df):
-    """Create a Plotly figure with subplots based on the processed data."""
+def visible_rows(df, x_range):
+    """Rows of a Timestamp-sorted frame inside ``x_range`` (``None`` means all rows)."""
+    if x_range is None or df.empty:
+        return df
+    start, end = pd.Timestamp(x_range[0]), pd.Timestamp(x_range[1])
+    timestamps = df['Timestamp'].to_numpy()
+    lo = timestamps.searchsorted(start.to_datetime64(), side='left')
+    hi = timestamps.searchsorted(end.to_datetime64(), side='right')
+    # Keep one sample either side so lines run to the edges of the view.
+    return df.iloc[max(lo - 1, 0):hi + 1]
+
+
+def create_plot(df, max_points=MAX_POINTS_PER_TRACE, method='minmax', x_range=None):
+    """Create a Plotly figure with subplots based on the processed data.
+
+    Each trace is downsampled to about ``max_points`` samples (``None`` keeps
+    every sample). With ``x_range`` only the visible rows are sampled, so
+    zooming in shows full resolution again. WebGL traces are used for large
+    inputs.
+    """
+    df = visible_rows(df, x_range)
+    scatter = go.Scattergl if len(df) > WEBGL_THRESHOLD else go.Scatter
+
     # Create subplots for the three different values
     fig = make_subplots(
         rows=3, cols=1,  # Three subplots in one column
@@ -54,24 +105,73 @@ def create_plot(df):
         subplot_titles=("Extrusion Time", "Dead Cycle Time", "Full Cycle Time")
     )
 
-    # Add Extrusion Time to the first subplot
-    fig.add_trace(go.Scatter(x=df['Timestamp'], y=df['Extrusion Time'], mode='lines', name='Extrusion Time'),
-                  row=1, col=1)
+    # Extrusion, Dead Cycle and Full Cycle Time each get their own subplot
+    for row, column in enumerate(VALUE_COLUMNS.values(), start=1):
+        x = df['Timestamp'].to_numpy()
+        y = df[column].to_numpy()
+        if max_points is not None:
+            with stage('downsample'):
+                index = downsample_indices(x, y, max_points, method)
+            x, y = x[index], y[index]
+        fig.add_trace(scatter(x=x, y=y, mode='lines', name=column), row=row, col=1)
 
-    # Add Dead Cycle Time to the second subplot
-    fig.add_trace(go.Scatter(x=df['Timestamp'], y=df['Dead Cycle Time'], mode='lines', name='Dead Cycle Time'),
-                  row=2, col=1)
-
-    # Add Full Cycle Time to the third subplot
-    fig.add_trace(go.Scatter(x=df['Timestamp'], y=df['Full Cycle Time'], mode='lines', name='Full Cycle Time'),
-                  row=3, col=1)
-
-   s
     fig.update_layout(
         height=800,  # Adjust the height of the figure
         title_text="Trend Data Over Time",  # Overall title
         xaxis_title="Timestamp",  # Shared X-axis title
-        showlegend=False  # Hide the legend to avoid redundancy
+        showlegend=False,  # Hide the legend to avoid redundancy
+        uirevision='trend-data'  # Keep the user's zoom when the figure is replaced
     )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
 
     return fig
+
+
+def relayout_x_range(relayout_data):
+    """Extract the zoomed x range from a Graph's ``relayoutData``.
+
+    Returns ``(start, end)``, ``None`` when the axes were reset, or ``False``
+    when the event did not change the x axis.
+    """
+    if not relayout_data:
+        return False
+    for key, value in relayout_data.items():
+        axis, _, attribute = key.partition('.')
+        if not axis.startswith('xaxis'):
+            continue
+        if attribute == 'autorange':
+            return None
+        if attribute == 'range':
+            return value[0], value[1]
+        if attribute == 'range[0]':
+            return value, relayout_data[f'{axis}.range[1]']
+    return False
+
+
+def register_trend_zoom_callback(app, graph_id, data_input, get_data, **plot_options):
+    """Own ``graph_id``'s figure: render it when ``data_input`` changes and re-render on zoom.
+
+    ``data_input`` is the ``dash.Input`` that signals new data (for example an
+    upload's ``contents``) and ``get_data`` returns the processed trend frame,
+    or ``None`` when nothing is loaded. Zooming re-samples only the visible
+    range from the full-resolution frame.
+    """
+    from dash import Input, Output, callback_context, no_update
+
+    @app.callback(Output(graph_id, 'figure'), [data_input, Input(graph_id, 'relayoutData')])
+    def update_trend_plot(_, relayout_data):
+        triggered = [trigger['prop_id'] for trigger in callback_context.triggered]
+        if f'{graph_id}.relayoutData' in triggered:
+            x_range = relayout_x_range(relayout_data)
+            if x_range is False:
+                return no_update
+        else:
+            x_range = None
+        df = get_data()
+        if df is None:
+            return no_update
+        with stage('plot'):
+            return create_plot(df, x_range=x_range, **plot_options)
+
+    return update_trend_plot
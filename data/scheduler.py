@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from data.instrumentation import request_context, stage
+
+
+class RefreshScheduler:
+    """Keep an ``AlarmStore`` fresh and run follow-up jobs off the request path.
+
+    Every ``interval`` seconds the store is refreshed and then each job
+    (for example pre-rendering figures) is run with no arguments. While the
+    scheduler runs the store's ``auto_refresh`` is turned off, so callbacks
+    only read what the scheduler has already loaded.
+
+    ``ensure_started`` is cheap and safe to call on every request: it also
+    restarts the thread in a forked worker, where the parent's thread does
+    not exist.
+    """
+
+    def __init__(self, store, jobs=(), interval=60, max_lag=None, instrumentation=None, name='scheduler'):
+        self.store = store
+        self.instrumentation = instrumentation
+        self.name = name
+        self.jobs = list(jobs)
+        self.interval = interval
+        self.max_lag = max_lag
+
+        self.runs = 0
+        self.job_failures = 0
+        self.last_run_at = None
+        self.last_run_seconds = None
+        self.last_job_error = None
+
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, store, jobs=(), instrumentation=None, interval=None, name='scheduler'):
+        max_lag = float(os.getenv('HEALTH_MAX_LAG_SECONDS', '0')) or None
+        if interval is None:
+            interval = float(os.getenv('SCHEDULER_INTERVAL_SECONDS', '60'))
+        return cls(store, jobs, interval=interval, max_lag=max_lag, instrumentation=instrumentation, name=name)
+
+    @property
+    def running(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def ensure_started(self):
+        if self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self.store.auto_refresh = False
+            self._thread = threading.Thread(target=self._run, name=f'refresh-{self.name}', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.store.auto_refresh = True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        with request_context(self.instrumentation, self.name):
+            self._run_jobs()
+
+    def _run_jobs(self):
+        started = time.monotonic()
+        self.store.refresh(force=True)
+        for job in self.jobs:
+            try:
+                with stage(getattr(job, '__name__', 'job')):
+                    job()
+            except Exception as e:
+                print(f"Error in scheduled job {getattr(job, '__name__', job)}: {str(e)}")
+                self.job_failures += 1
+                self.last_job_error = str(e)
+        self.runs += 1
+        self.last_run_at = datetime.now()
+        self.last_run_seconds = time.monotonic() - started
+
+    def status(self):
+        store_status = self.store.status()
+        lag = store_status['refresh_age_seconds']
+        healthy = store_status['rows'] > 0 and store_status['consecutive_failures'] == 0
+        if self.max_lag is not None:
+            healthy = healthy and lag is not None and lag <= self.max_lag
+        return {
+            'healthy': healthy,
+            'scheduler': {
+                'running': self.running,
+                'interval_seconds': self.interval,
+                'runs': self.runs,
+                'last_run_at': None if self.last_run_at is None else self.last_run_at.isoformat(),
+                'last_run_seconds': self.last_run_seconds,
+                'job_failures': self.job_failures,
+                'last_job_error': self.last_job_error,
+            },
+            'store': store_status,
+        }
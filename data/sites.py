@@ -0,0 +1,167 @@
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from data.alarm_store import AlarmStore
+from data.analytics import AlarmAnalytics
+from data.data_fetcher import SheetsClient
+from data.downtime_cube import DowntimeCube
+from data.equipment_groups import EquipmentGrouping
+from data.figure_cache import FigureCache
+from data.frappe_client import FrappeClient
+from data.live import LiveTimelines
+
+
+DEFAULT_SITE = 'default'
+
+
+def load_sites(path):
+    """Read the site configuration (``{"site": {option: value, ...}}``) from a JSON file.
+
+    Options of a site:
+
+    - ``title``: name shown in the site picker (defaults to the site name)
+    - ``source``: ``frappe`` (default) or ``sheets``
+    - ``api_url``, ``token`` or ``token_env``: Frappe endpoint and credentials
+    - ``spreadsheet_id``, ``api_key`` or ``api_key_env``: Google Sheets source
+    - ``grouping_file``: equipment grouping JSON (see ``data.equipment_groups``)
+    - ``refresh_seconds``: background refresh interval of this site
+    """
+    with open(path) as f:
+        sites = json.load(f)
+    if not isinstance(sites, dict) or not sites or not all(isinstance(site, dict) for site in sites.values()):
+        raise ValueError(f"{path} must map site names to objects of site options")
+    return sites
+
+
+def sites_from_env():
+    """Sites listed in ``SITES_FILE``, or one ``default`` site configured by the usual variables."""
+    path = os.getenv('SITES_FILE')
+    if path:
+        return load_sites(path)
+    return {DEFAULT_SITE: {
+        'source': os.getenv('ALARM_SOURCE', 'frappe').lower(),
+        'api_url': os.getenv('API_URL'),
+        'token_env': 'AUTHORIZATION_TOKEN',
+        'spreadsheet_id': os.getenv('SPREADSHEET_ID'),
+        'api_key_env': 'GOOGLE_API_KEY',
+        'grouping_file': os.getenv('EQUIPMENT_GROUPING_FILE') or None,
+    }}
+
+
+def _secret(config, name):
+    return config.get(name) or (os.getenv(config[f'{name}_env']) if config.get(f'{name}_env') else None)
+
+
+@lru_cache(maxsize=None)
+def _frappe_client(api_url, token, page_length, timeout):
+    return FrappeClient(api_url, token, page_length=page_length, timeout=timeout)
+
+
+def fetch_frappe_rows(api_url, token, page_length, timeout, since=None):
+    """Fetch, normalize and deduplicate Frappe rows; runs in a pool process, so clients are cached per process."""
+    df = _frappe_client(api_url, token, page_length, timeout).fetch(since)
+    return df.drop_duplicates(ignore_index=True) if not df.empty else df
+
+
+class WorkerPool:
+    """Process pool created on first use in each process.
+
+    Creating it lazily keeps it out of the gunicorn master: every forked
+    worker starts its own pool. Processes are spawned rather than forked so
+    they do not inherit the worker's threads and locks.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._pid = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, sites):
+        workers = os.getenv('SITE_WORKERS')
+        max_workers = int(workers) if workers not in (None, '') else (min(len(sites), os.cpu_count() or 1)
+                                                                        if len(sites) > 1 else 0)
+        return cls(max_workers) if max_workers > 0 else None
+
+    def submit(self, func, *args):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            executor = self._executor
+        return executor.submit(func, *args)
+
+
+class SiteSource:
+    """``fetch(since)`` callable for one site's ``AlarmStore``.
+
+    Frappe pages are fetched and parsed in ``pool`` when one is given, so the
+    CPU spent normalizing one site's refresh does not hold the GIL while
+    another site's figures are rendered. Google Sheets reads keep their row
+    offset in this process and run on the calling thread.
+    """
+
+    def __init__(self, name, config, pool=None):
+        self.name = name
+        self.kind = config.get('source', 'frappe')
+        self.pool = pool
+        if self.kind == 'sheets':
+            self.sheets = SheetsClient(config.get('spreadsheet_id'), api_key=_secret(config, 'api_key'))
+        elif self.kind == 'frappe':
+            self.frappe_options = (
+                config.get('api_url'),
+                _secret(config, 'token'),
+                int(config.get('page_length', os.getenv('FRAPPE_PAGE_LENGTH', '10000'))),
+                float(config.get('timeout', os.getenv('FRAPPE_TIMEOUT_SECONDS', '60'))),
+            )
+        else:
+            raise ValueError(f"Unknown alarm source for site {name}: {self.kind}")
+
+    def __call__(self, since=None):
+        if self.kind == 'sheets':
+            df = self.sheets.fetch(since)
+        elif self.pool is not None:
+            df = self.pool.submit(fetch_frappe_rows, *self.frappe_options, since).result()
+        else:
+            df = fetch_frappe_rows(*self.frappe_options, since)
+        print(f'Records fetched for {self.name}: {df.shape[0]}')
+        return df
+
+
+class Site:
+    """One plant or press line with its own alarm store, equipment grouping, downtime cube, live timelines, analytics and figure cache.
+
+    A site's scheduler is attached by the app once its jobs are defined.
+    Nothing is shared between sites except the process pool, so a slow
+    refresh of one site never holds up another.
+    """
+
+    def __init__(self, name, config, default_grouping, pool=None, partitioned=True):
+        self.name = name
+        self.title = config.get('title') or name
+        self.refresh_seconds = config.get('refresh_seconds')
+        partition = name if partitioned else None
+        self.source = SiteSource(name, config, pool)
+        self.store = AlarmStore.from_env(self.source, partition=partition)
+        self.grouping = EquipmentGrouping(default_grouping, path=config.get('grouping_file'))
+        self.store.add_listener(self.grouping.on_store_change)
+        self.cube = DowntimeCube(self.grouping)
+        self.store.add_listener(self.cube.on_store_change)
+        self.live = LiveTimelines(self.store, self.grouping)
+        self.store.add_listener(self.live.on_store_change)
+        self.analytics = AlarmAnalytics(self.store, self.grouping)
+        self.store.add_listener(self.analytics.on_store_change)
+        self.figure_cache = FigureCache.from_env(partition)
+        self.scheduler = None
+
+
+def build_sites(configs, default_grouping, pool=None):
+    """``Site`` objects by name. A lone ``default`` site keeps the unpartitioned snapshot and cache paths."""
+    partitioned = list(configs) != [DEFAULT_SITE]
+    return {name: Site(name, config, default_grouping, pool, partitioned) for name, config in configs.items()}
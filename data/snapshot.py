@@ -0,0 +1,141 @@
+import contextlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; snapshots are then not locked
+    fcntl = None
+
+
+class AlarmSnapshot:
+    """Columnar on-disk snapshot of a normalized alarm frame.
+
+    Each snapshot generation is a directory holding one ``.npy`` file per
+    column plus a ``manifest.json`` that records the column types, the
+    ``tslast`` high-water mark and, for every day, the ``[start, end)`` row
+    range of that day's partition in the ``tslast``-sorted columns.
+    Categorical columns are stored as integer codes with their categories in
+    the manifest.
+
+    ``load`` memory-maps the columns read-only and builds the frame without
+    copying them, so workers on the same host share one copy in the page cache.
+    ``CURRENT`` names the live generation and is replaced atomically.
+    """
+
+    def __init__(self, path, keep_generations=2):
+        self.path = path
+        self.keep_generations = keep_generations
+
+    @classmethod
+    def from_env(cls, partition=None):
+        """Snapshot in ``ALARM_SNAPSHOT_DIR`` (or its ``partition`` subdirectory), or ``None`` when unset."""
+        path = os.getenv('ALARM_SNAPSHOT_DIR')
+        if not path:
+            return None
+        return cls(os.path.join(path, partition) if partition else path)
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Hold an exclusive lock across processes while refreshing the snapshot."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'LOCK'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def current_generation(self):
+        try:
+            with open(os.path.join(self.path, 'CURRENT')) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _generation_dir(self, generation):
+        return os.path.join(self.path, f'gen-{generation:08d}')
+
+    def load(self):
+        """Return ``(df, manifest)`` for the current generation, or ``(None, None)``."""
+        generation = self.current_generation()
+        if generation is None:
+            return None, None
+        directory = self._generation_dir(generation)
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+
+        columns = {}
+        for name, spec in manifest['columns'].items():
+            values = np.load(os.path.join(directory, spec['file']), mmap_mode='r')
+            if spec['kind'] == 'category':
+                values = pd.Categorical.from_codes(values, spec['categories'])
+            columns[name] = values
+        df = pd.DataFrame(columns, copy=False)
+        return df, manifest
+
+    def write(self, df):
+        """Write ``df`` (normalized, sorted by ``tslast``) as a new generation and make it current."""
+        generation = (self.current_generation() or 0) + 1
+        directory = self._generation_dir(generation)
+        tmp_directory = directory + '.tmp'
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+
+        columns = {}
+        for position, name in enumerate(df.columns):
+            series = df[name]
+            filename = f'{position:03d}.npy'
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(tmp_directory, filename), series.cat.codes.to_numpy())
+                columns[name] = {'file': filename, 'kind': 'category',
+                                 'categories': series.cat.categories.tolist()}
+            elif series.dtype == object:
+                categorical = series.astype('category')
+                np.save(os.path.join(tmp_directory, filename), categorical.cat.codes.to_numpy())
+                columns[name] = {'file': filename, 'kind': 'category',
+                                 'categories': categorical.cat.categories.tolist()}
+            else:
+                np.save(os.path.join(tmp_directory, filename), series.to_numpy())
+                columns[name] = {'file': filename, 'kind': 'array'}
+
+        manifest = {
+            'generation': generation,
+            'rows': len(df),
+            'high_water_mark': str(df['tslast'].iloc[-1]) if len(df) else None,
+            'columns': columns,
+            'days': day_partitions(df),
+        }
+        with open(os.path.join(tmp_directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+
+        os.replace(tmp_directory, directory)
+        current_tmp = os.path.join(self.path, 'CURRENT.tmp')
+        with open(current_tmp, 'w') as f:
+            f.write(str(generation))
+        os.replace(current_tmp, os.path.join(self.path, 'CURRENT'))
+        self._remove_old_generations(generation)
+        return generation
+
+    def _remove_old_generations(self, generation):
+        # Workers still mapping an older generation keep their pages after unlink.
+        for entry in os.listdir(self.path):
+            if entry.startswith('gen-') and not entry.endswith('.tmp'):
+                if int(entry[4:]) <= generation - self.keep_generations:
+                    shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+
+def day_partitions(df, column='tslast'):
+    """Map each day (``YYYY-MM-DD``) to the ``[start, end)`` rows it occupies in a frame sorted by ``column``."""
+    if df.empty:
+        return {}
+    days = df[column].dt.normalize().to_numpy()
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    ends = np.r_[starts[1:], len(days)]
+    return {str(pd.Timestamp(days[start]).date()): [int(start), int(end)] for start, end in zip(starts, ends)}
@@ -0,0 +1,119 @@
+import base64
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+SHIFT_HOURS = (7, 17)
+
+
+def alarm_names(grouping):
+    """All alarm names of an equipment grouping, in order and without duplicates."""
+    return list(dict.fromkeys(alarm for alarms in grouping.values() for alarm in alarms))
+
+
+def alarm_records(n, alarms, start='2024-01-01', days=30, unknown_share=0.01, seed=0):
+    """``n`` Frappe alarm rows (dicts of ``ALARM_FIELDS``) spread over ``days`` days.
+
+    Most alarms fall inside the shift hours, a few alarm names account for most
+    rows and durations are log-normal (minutes, with a long tail), as in the
+    plant's alarm log. ``unknown_share`` of the rows use alarm names that are
+    not in ``alarms``. Rows are ordered by ``tslast`` like the API returns them.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start)
+
+    day = rng.integers(0, days, n)
+    in_shift = rng.random(n) < 0.8
+    hour = np.where(in_shift, rng.integers(*SHIFT_HOURS, n), rng.integers(0, 24, n))
+    seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, n)
+    tslast = start + pd.to_timedelta(np.sort(seconds), unit='s')
+
+    minutes = np.round(rng.lognormal(mean=1.0, sigma=1.2, size=n), 2)
+    tsactive = tslast - pd.to_timedelta(minutes, unit='m')
+
+    weights = 1.0 / np.arange(1, len(alarms) + 1)
+    names = np.asarray(alarms, dtype=object)[rng.choice(len(alarms), n, p=weights / weights.sum())]
+    unknown = rng.random(n) < unknown_share
+    names[unknown] = [f'UNLISTED ALARM {code}' for code in rng.integers(0, 20, unknown.sum())]
+
+    return pd.DataFrame({
+        'tslast': tslast.strftime('%Y-%m-%d %H:%M:%S.%f'),
+        'tsactive': tsactive.strftime('%Y-%m-%d %H:%M:%S.%f'),
+        'alarm': names,
+        'time_difference_minutes': minutes,
+    }).to_dict('records')
+
+
+def alarm_payload(records, limit_start=0, page_length=None):
+    """One page of a Frappe ``/api/resource`` response holding ``records``."""
+    end = None if page_length is None else limit_start + page_length
+    return {'data': records[limit_start:end]}
+
+
+def trend_frame(n, start='2024-01-01', interval_seconds=1, seed=0):
+    """``n`` raw ``TblTrendData`` rows: ``TS`` in microseconds and values scaled by 1e6."""
+    rng = np.random.default_rng(seed)
+    ts = pd.Timestamp(start).value // 1000 + np.arange(n, dtype='int64') * interval_seconds * 10**6
+    cycle = np.sin(np.arange(n) / 600.0)
+    extrusion = 40 + 5 * cycle + rng.normal(0, 1.5, n)
+    dead_cycle = 12 + rng.gamma(2.0, 1.0, n)
+    values = {
+        'Val1': extrusion,
+        'Val2': dead_cycle,
+        'Val3': extrusion + dead_cycle,
+    }
+    frame = pd.DataFrame({'TS': ts})
+    for column, value in values.items():
+        frame[column] = np.round(value * 1e6).astype('int64')
+    return frame
+
+
+def trend_sqlite_bytes(n, start='2024-01-01', interval_seconds=1, seed=0):
+    """An SQLite database with a ``TblTrendData`` table of ``n`` rows, as bytes."""
+    frame = trend_frame(n, start, interval_seconds, seed)
+    conn = sqlite3.connect(':memory:')
+    if not hasattr(conn, 'serialize'):
+        # sqlite3.Connection.serialize needs Python 3.11; build the file on disk instead.
+        conn.close()
+        tmp = tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False)
+        tmp.close()
+        conn = sqlite3.connect(tmp.name)
+    else:
+        tmp = None
+    try:
+        conn.execute('CREATE TABLE TblTrendData (TS INTEGER, Val1 INTEGER, Val2 INTEGER, Val3 INTEGER)')
+        conn.executemany('INSERT INTO TblTrendData VALUES (?, ?, ?, ?)', frame.itertuples(index=False, name=None))
+        conn.commit()
+        if tmp is None:
+            return conn.serialize()
+    finally:
+        conn.close()
+    try:
+        with open(tmp.name, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(tmp.name)
+
+
+def upload_contents(data, content_type='application/octet-stream'):
+    """Encode file bytes the way ``dcc.Upload`` passes them to callbacks."""
+    return f'data:{content_type};base64,{base64.b64encode(data).decode()}'
+
+
+def thermocouple_frame(n, start='2024-01-01', columns=8, freq='1min', seed=0):
+    """``n`` thermocouple readings indexed by ``Version`` with one column per thermocouple."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start=start, periods=n, freq=freq, name='Version')
+    hour = index.hour.to_numpy()
+    warm_up = np.clip((hour - 5) / 3, 0, 1)
+    frame = {}
+    for column in range(1, columns + 1):
+        setpoint = 440 + 5 * column
+        frame[f'Thermocouple {column}'] = (
+            20 + (setpoint - 20) * warm_up + rng.normal(0, 3, n)
+        ).astype('float32')
+    return pd.DataFrame(frame, index=index)
@@ -1,32 +1,128 @@
+import threading
+from io import BytesIO
+
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import plotly.graph_objects as go
 
-def generate_heatmap_thermocouple(df, start_date, end_date, thermocouple):
-    start_date = pd.to_datetime(start_date)
-    end_date = pd.to_datetime(end_date)
-    filtered_df = df[start_date:end_date]
 
-    if filtered_df.empty:
-        print(f"No data available for the specified date range: {start_date} to {end_date}")
-        return None  
+class ThermocoupleRollup:
+    """Hourly mean temperature of every thermocouple, maintained incrementally.
+
+    Readings are frames indexed by timestamp (``Version``) with one column per
+    thermocouple. Hourly sums and counts are kept so new readings can be
+    folded in without revisiting old ones.
+    """
+
+    def __init__(self, readings=None):
+        self._sums = pd.DataFrame()
+        self._counts = pd.DataFrame()
+        self._lock = threading.Lock()
+        if readings is not None:
+            self.update(readings)
+
+    def update(self, readings):
+        if readings.empty:
+            return
+        hours = readings.index.floor('h')
+        grouped = readings.groupby(hours)
+        sums, counts = grouped.sum(), grouped.count()
+        with self._lock:
+            self._sums = sums if self._sums.empty else self._sums.add(sums, fill_value=0).sort_index()
+            self._counts = counts if self._counts.empty else self._counts.add(counts, fill_value=0).sort_index()
+
+    def hourly(self, start_date=None, end_date=None, columns=None):
+        """Hourly means of the hours from ``start_date`` through ``end_date``.
+
+        Both bounds are converted with ``pd.to_datetime`` as before, so a date
+        without a time ends at midnight and its day is left out. The hours are
+        whole buckets: the first and last hours include all of their readings,
+        not only those inside the bounds. Empty when nothing was recorded for
+        ``columns``.
+        """
+        sums, counts = self._sums, self._counts
+        if sums.empty or (columns is not None and not set(columns) <= set(sums.columns)):
+            empty = pd.DataFrame(columns=columns if columns is not None else sums.columns, dtype='float64')
+            empty.index = pd.DatetimeIndex([], name='Version')
+            return empty
+        if columns is not None:
+            sums, counts = sums[columns], counts[columns]
+        start = pd.to_datetime(start_date).floor('h') if start_date is not None else None
+        end = pd.to_datetime(end_date) if end_date is not None else None
+        sums, counts = sums[start:end], counts[start:end]
+        means = sums / counts.where(counts > 0)
+        means.index.name = 'Version'
+        return means
+
 
-    hourly_df = filtered_df.resample('h').mean()
+def heatmap_table(rollup, start_date, end_date, thermocouple):
+    """Date x time table of hourly means between 06:00 and 18:00, or ``None`` without data."""
+    hourly_df = rollup.hourly(start_date, end_date, columns=[thermocouple])
+    if hourly_df.empty:
+        print(f"No data available for the specified date range: {start_date} to {end_date}")
+        return None
     hourly_df = hourly_df.between_time('06:00', '18:00')
     heatmap_data = hourly_df[[thermocouple]].reset_index()
     heatmap_data['Date'] = heatmap_data['Version'].dt.date
-    heatmap_data['Time'] = heatmap_data['Version'].dt.time
-    heatmap_pivot = heatmap_data.pivot(index='Date', columns='Time', values=thermocouple)
+    heatmap_data['Time'] = heatmap_data['Version'].dt.strftime('%H:%M')
+    return heatmap_data.pivot(index='Date', columns='Time', values=thermocouple)
+
+
+def generate_heatmap_thermocouple(df, start_date, end_date, thermocouple, rollup=None):
+    """Plotly heatmap of a thermocouple's hourly temperatures.
+
+    Pass a shared ``rollup`` to reuse hourly aggregates across requests;
+    otherwise one is computed from ``df`` for this thermocouple only.
+    """
+    if rollup is None:
+        rollup = ThermocoupleRollup(df[[thermocouple]])
+    heatmap_pivot = heatmap_table(rollup, start_date, end_date, thermocouple)
+    if heatmap_pivot is None:
+        return None
+
+    fig = go.Figure(go.Heatmap(
+        z=heatmap_pivot.to_numpy(),
+        x=list(heatmap_pivot.columns),
+        y=[str(date) for date in heatmap_pivot.index],
+        text=heatmap_pivot.to_numpy(),
+        texttemplate='%{text:.1f}',
+        colorscale='RdBu_r',
+        colorbar=dict(title='Temperature (°C)'),
+        hovertemplate='Date: %{y}<br>Time: %{x}<br>Temperature: %{z:.1f} °C<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f'Hourly Temperature Performance of Thermocouple {thermocouple[-1]}',
+        xaxis_title='Time',
+        yaxis_title='Date',
+        xaxis=dict(tickangle=-45, type='category'),
+        yaxis=dict(autorange='reversed', type='category'),
+        height=600
+    )
+    return fig
+
+
+def heatmap_png(rollup, start_date, end_date, thermocouple):
+    """Render the heatmap as PNG bytes in memory, or ``None`` without data."""
+    heatmap_pivot = heatmap_table(rollup, start_date, end_date, thermocouple)
+    if heatmap_pivot is None:
+        return None
+
+    # Imported here so processes that never render PNGs do not pay for matplotlib.
+    from matplotlib.figure import Figure
 
-    plt.figure(figsize=(12, 6))
-    ax = sns.heatmap(heatmap_pivot, cmap='coolwarm', annot=True, fmt=".1f", cbar_kws={'label': 'Temperature (°C)'})
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    values = heatmap_pivot.to_numpy(dtype='float64')
+    image = ax.imshow(values, cmap='coolwarm', aspect='auto')
+    for (row, column), value in pd.DataFrame(values).stack().items():
+        ax.text(column, row, f'{value:.1f}', ha='center', va='center', fontsize=8)
+    fig.colorbar(image, ax=ax, label='Temperature (°C)')
+    ax.set_xticks(range(len(heatmap_pivot.columns)), heatmap_pivot.columns, rotation=45, ha='right')
+    ax.set_yticks(range(len(heatmap_pivot.index)), [str(date) for date in heatmap_pivot.index])
     ax.set_title(f'Hourly Temperature Performance of Thermocouple {thermocouple[-1]}')
     ax.set_xlabel('Time')
     ax.set_ylabel('Date')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
+    fig.tight_layout()
 
-    heatmap_filename = f"heatmap_{thermocouple[-1]}.png"
-    plt.savefig(heatmap_filename)
-    plt.close()  
-    return heatmap_filename  
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
@@ -0,0 +1,340 @@
+import numpy as np
+import pandas as pd
+
+
+SEGMENT_COLUMNS = ['group', 'start', 'end', 'downtime', 'active', 'first_tsactive', 'alarms']
+
+
+def _empty_segments():
+    return pd.DataFrame({
+        'group': pd.Categorical([]),
+        'start': pd.Series(dtype='datetime64[ns]'),
+        'end': pd.Series(dtype='datetime64[ns]'),
+        'downtime': pd.Series(dtype='float64'),
+        'active': pd.Series(dtype='float64'),
+        'first_tsactive': pd.Series(dtype='datetime64[ns]'),
+        'alarms': pd.Series(dtype='object'),
+    })
+
+
+def _emitting_buckets(downtime):
+    """Mark the buckets that close a segment.
+
+    A segment is closed at the first hour edge where the downtime accumulated
+    since the previous segment is positive; hours without downtime are folded
+    into the next segment.
+    """
+    if (downtime >= 0).all():
+        return downtime > 0
+
+    emit = np.zeros(downtime.shape, dtype=bool)
+    for g in range(downtime.shape[0]):
+        running = 0.0
+        for k in range(1, downtime.shape[1]):
+            running += downtime[g, k]
+            if running > 0:
+                emit[g, k] = True
+                running = 0.0
+    return emit
+
+
+def build_timeline(df, start, end, group_col, freq='h', time_col='tslast', active_col='tsactive',
+                   value_col='time_difference_minutes', alarm_col='alarm'):
+    """Bin alarms into (group, hour) buckets between ``start`` and ``end``.
+
+    Returns one row per segment with the columns in ``SEGMENT_COLUMNS``. Groups
+    are ordered by ascending total downtime, so the worst group is plotted last
+    (at the top of a horizontal bar chart). Each group ends with a trailing
+    Good State segment with zero downtime when its last alarm bucket closes
+    before ``end``.
+    """
+    edges = pd.date_range(start=start, end=end, freq=freq)
+    n_edges = len(edges)
+    if df.empty or n_edges < 2:
+        return _empty_segments()
+
+    edge_values = edges.to_numpy(dtype='datetime64[ns]')
+    tslast = pd.to_datetime(df[time_col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    in_window = (tslast >= edge_values[0]) & (tslast < edge_values[-1])
+    in_window &= pd.notna(df[group_col]).to_numpy()
+    if not in_window.any():
+        return _empty_segments()
+
+    window = df[in_window]
+    tslast = tslast[in_window]
+    values = pd.to_numeric(window[value_col], errors='coerce').fillna(0).to_numpy(dtype='float64')
+    groups = pd.Categorical(window[group_col]).remove_unused_categories()
+    groups = groups.reorder_categories(groups.categories.sort_values())
+    codes = groups.codes.astype('int64')
+    n_groups = len(groups.categories)
+
+    order = np.lexsort((tslast, codes))
+    codes = codes[order]
+    tslast = tslast[order]
+    values = values[order]
+    tsactive = pd.to_datetime(window[active_col], errors='coerce').to_numpy(dtype='datetime64[ns]')[order]
+    alarms = window[alarm_col].to_numpy()[order]
+
+    buckets = np.searchsorted(edge_values, tslast, side='right')
+    downtime = np.bincount(codes * n_edges + buckets, weights=values,
+                           minlength=n_groups * n_edges).reshape(n_groups, n_edges)
+
+    emit = _emitting_buckets(downtime)
+    closing = np.where(emit, np.arange(n_edges), n_edges)
+    closing = np.minimum.accumulate(closing[:, ::-1], axis=1)[:, ::-1]
+
+    seg_groups, seg_ends = np.nonzero(emit)
+    seg_ids = np.full((n_groups, n_edges + 1), -1)
+    seg_ids[seg_groups, seg_ends] = np.arange(len(seg_groups))
+    first_in_group = np.ones(len(seg_groups), dtype=bool)
+    first_in_group[1:] = seg_groups[1:] != seg_groups[:-1]
+    seg_starts = np.where(first_in_group, 0, np.r_[0, seg_ends][:-1])
+
+    cumulative = downtime.cumsum(axis=1)
+    seg_downtime = cumulative[seg_groups, seg_ends] - cumulative[seg_groups, seg_starts]
+    seg_span = (edge_values[seg_ends] - edge_values[seg_starts]) / np.timedelta64(1, 'm')
+
+    row_segments = seg_ids[codes, closing[codes, buckets]]
+    assigned = np.flatnonzero(row_segments >= 0)
+    assigned_segments = row_segments[assigned]
+    new_segment = np.ones(len(assigned), dtype=bool)
+    new_segment[1:] = assigned_segments[1:] != assigned_segments[:-1]
+    first_rows = assigned[new_segment]
+    first_tsactive = tsactive[first_rows]
+    first_tsactive = np.where(np.isnat(first_tsactive), edge_values[seg_starts], first_tsactive)
+    alarm_lists = (
+        pd.DataFrame({'segment': assigned_segments, 'alarm': alarms[assigned]})
+        .drop_duplicates()
+        .groupby('segment', sort=True)['alarm']
+        .agg(list)
+        .reindex(np.arange(len(seg_groups)))
+    )
+
+    segments = pd.DataFrame({
+        'group': seg_groups,
+        'start': edges[seg_starts],
+        'end': edges[seg_ends],
+        'downtime': seg_downtime,
+        'active': seg_span - seg_downtime,
+        'first_tsactive': first_tsactive,
+        'alarms': alarm_lists.to_numpy(),
+    })
+
+    last_closed = np.where(emit.any(axis=1), n_edges - 1 - np.argmax(emit[:, ::-1], axis=1), 0)
+    open_groups = np.flatnonzero(last_closed < n_edges - 1)
+    tails = pd.DataFrame({
+        'group': open_groups,
+        'start': edges[last_closed[open_groups]],
+        'end': edges[np.full(len(open_groups), n_edges - 1)],
+        'downtime': 0.0,
+        'active': (edge_values[-1] - edge_values[last_closed[open_groups]]) / np.timedelta64(1, 'm'),
+        'first_tsactive': pd.NaT,
+        'alarms': [[] for _ in open_groups],
+    })
+
+    segments = pd.concat([segments, tails], ignore_index=True)
+    plot_order = np.argsort(-downtime.sum(axis=1), kind='stable')[::-1]
+    rank = np.empty(n_groups, dtype=int)
+    rank[plot_order] = np.arange(n_groups)
+    segments['group'] = rank[segments['group'].to_numpy()]
+    segments = segments.sort_values(['group', 'start'], kind='stable', ignore_index=True)
+    segments['group'] = pd.Categorical.from_codes(segments['group'], groups.categories[plot_order])
+    return segments[SEGMENT_COLUMNS]
+
+
+BUCKET_COLUMNS = ['group', 'start', 'end', 'downtime', 'available', 'availability']
+
+_NS_PER_MINUTE = 60 * 10**9
+
+
+def alarm_intervals(df, group_col, time_col='tslast', active_col='tsactive', value_col='time_difference_minutes'):
+    """Each alarm as a ``[tsactive, tslast)`` interval in int64 nanoseconds.
+
+    When ``tsactive`` is missing the interval is reconstructed from ``tslast``
+    and ``value_col``. Rows without an end or a group are dropped. Returns
+    ``(rows, groups, starts, ends)`` where ``rows`` are the kept positions in
+    ``df`` and ``groups`` is a categorical with sorted categories.
+    """
+    ends = pd.to_datetime(df[time_col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    starts = pd.to_datetime(df[active_col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    minutes = pd.to_numeric(df[value_col], errors='coerce').fillna(0).to_numpy(dtype='float64')
+    keep = ~np.isnat(ends) & pd.notna(df[group_col]).to_numpy()
+    rows = np.flatnonzero(keep)
+
+    ends = ends[rows].astype('int64')
+    missing = np.isnat(starts[rows])
+    starts = np.where(missing, ends - (minutes[rows] * _NS_PER_MINUTE).astype('int64'), starts[rows].astype('int64'))
+    starts = np.minimum(starts, ends)
+
+    groups = pd.Categorical(df[group_col].iloc[rows]).remove_unused_categories()
+    groups = groups.reorder_categories(groups.categories.sort_values())
+    return rows, groups, starts, ends
+
+
+def merge_intervals(codes, starts, ends):
+    """Merge overlapping or touching ``[start, end)`` intervals per group with a sort-and-sweep.
+
+    Returns ``(order, run, merged_codes, merged_starts, merged_ends)``: ``order``
+    sorts the inputs by (group, start) and ``run[i]`` is the merged interval
+    that input ``order[i]`` belongs to. Merged intervals are sorted by group
+    and start and are disjoint within a group.
+    """
+    order = np.lexsort((starts, codes))
+    codes, starts, ends = codes[order], starts[order], ends[order]
+    if len(codes) == 0:
+        return order, np.zeros(0, dtype='int64'), codes, starts, ends
+
+    reach = pd.Series(ends).groupby(codes).cummax().to_numpy()
+    new_run = np.ones(len(codes), dtype=bool)
+    new_run[1:] = (codes[1:] != codes[:-1]) | (starts[1:] > reach[:-1])
+    run = np.cumsum(new_run) - 1
+    first = np.flatnonzero(new_run)
+    last = np.r_[first[1:], len(codes)] - 1
+    return order, run, codes[first], starts[first], reach[last]
+
+
+def split_at_edges(codes, starts, ends, edges, n_groups):
+    """Minutes covered by disjoint ``[start, end)`` intervals in each (group, bucket).
+
+    Intervals must lie within ``edges[0]`` and ``edges[-1]``; each is split
+    exactly at the bucket edges it crosses, so a bucket never holds more
+    minutes than it is long.
+    """
+    n_buckets = len(edges) - 1
+    first = np.searchsorted(edges, starts, side='right') - 1
+    last = np.searchsorted(edges, ends, side='left') - 1
+    same = first == last
+
+    head = np.where(same, ends, edges[np.minimum(first + 1, n_buckets)]) - starts
+    tail = np.where(same, 0, ends - edges[last])
+    size = n_groups * n_buckets
+    covered = (np.bincount(codes * n_buckets + first, weights=head, minlength=size)
+               + np.bincount(codes * n_buckets + last, weights=tail, minlength=size))
+
+    # Buckets strictly between the first and last are fully covered.
+    full = ~same & (last > first + 1)
+    width = n_buckets + 1
+    spans = (np.bincount(codes[full] * width + first[full] + 1, minlength=n_groups * width)
+             - np.bincount(codes[full] * width + last[full], minlength=n_groups * width))
+    spans = spans.reshape(n_groups, width).cumsum(axis=1)[:, :n_buckets]
+
+    covered = covered.reshape(n_groups, n_buckets) + spans * np.diff(edges)
+    return covered / _NS_PER_MINUTE
+
+
+def _window_intervals(df, start, end, group_col, time_col, active_col, value_col):
+    """Merged alarm intervals per group clipped to ``[start, end)``."""
+    rows, groups, starts, ends = alarm_intervals(df, group_col, time_col, active_col, value_col)
+    window_start = pd.Timestamp(start).value
+    window_end = pd.Timestamp(end).value
+    overlaps = (ends > window_start) & (starts < window_end) & (ends > starts)
+    rows, groups = rows[overlaps], groups[overlaps]
+    starts, ends = starts[overlaps], ends[overlaps]
+
+    codes = groups.codes.astype('int64')
+    order, run, merged_codes, merged_starts, merged_ends = merge_intervals(codes, starts, ends)
+    clipped_starts = np.maximum(merged_starts, window_start)
+    clipped_ends = np.minimum(merged_ends, window_end)
+    return (rows[order], run, groups.categories,
+            merged_codes, merged_starts, clipped_starts, clipped_ends, window_start, window_end)
+
+
+def downtime_buckets(df, start, end, group_col, freq='h', time_col='tslast', active_col='tsactive',
+                     value_col='time_difference_minutes'):
+    """Downtime and available minutes per (group, bucket) between ``start`` and ``end``.
+
+    Overlapping alarms of a group are counted once and alarms spanning several
+    buckets are split at the bucket edges, so ``downtime + available`` always
+    equals the bucket length and ``availability`` lies between 0 and 1.
+    """
+    edges = pd.date_range(start=start, end=end, freq=freq)
+    columns = {'group': pd.Categorical([]), 'start': pd.Series(dtype='datetime64[ns]'),
+               'end': pd.Series(dtype='datetime64[ns]')}
+    empty = pd.DataFrame({**columns, **{column: pd.Series(dtype='float64') for column in BUCKET_COLUMNS[3:]}})
+    if df.empty or len(edges) < 2:
+        return empty
+
+    (_, _, categories, codes, _, clipped_starts, clipped_ends,
+     _, _) = _window_intervals(df, edges[0], edges[-1], group_col, time_col, active_col, value_col)
+    if len(codes) == 0:
+        return empty
+
+    edge_values = edges.to_numpy(dtype='datetime64[ns]').astype('int64')
+    downtime = split_at_edges(codes, clipped_starts, clipped_ends, edge_values, len(categories))
+    bucket_minutes = np.diff(edge_values) / _NS_PER_MINUTE
+    n_groups, n_buckets = downtime.shape
+    buckets = pd.DataFrame({
+        'group': pd.Categorical.from_codes(np.repeat(np.arange(n_groups), n_buckets), categories),
+        'start': np.tile(edges[:-1], n_groups),
+        'end': np.tile(edges[1:], n_groups),
+        'downtime': downtime.ravel(),
+        'available': (bucket_minutes - downtime).ravel(),
+    })
+    buckets['availability'] = buckets['available'] / np.tile(bucket_minutes, n_groups)
+    return buckets[BUCKET_COLUMNS]
+
+
+def interval_timeline(df, start, end, group_col, time_col='tslast', active_col='tsactive',
+                      value_col='time_difference_minutes', alarm_col='alarm'):
+    """Timeline of merged alarm intervals between ``start`` and ``end``.
+
+    Returns the same columns as ``build_timeline``, but each segment is the
+    good time since the previous downtime followed by one merged downtime
+    interval, placed where it actually happened. Overlapping alarms of a
+    group are merged so their minutes are counted once, and downtime outside
+    the window is clipped off. ``first_tsactive`` is the unclipped start of
+    the merged interval. Groups are ordered by ascending total downtime and
+    end with a Good State segment up to ``end``.
+    """
+    if df.empty:
+        return _empty_segments()
+    (rows, run, categories, codes, merged_starts, clipped_starts, clipped_ends,
+     window_start, window_end) = _window_intervals(df, start, end, group_col, time_col, active_col, value_col)
+    if len(codes) == 0:
+        return _empty_segments()
+
+    new_group = np.ones(len(codes), dtype=bool)
+    new_group[1:] = codes[1:] != codes[:-1]
+    previous_ends = np.where(new_group, window_start, np.r_[window_start, clipped_ends[:-1]])
+
+    alarm_lists = (
+        pd.DataFrame({'segment': run, 'alarm': df[alarm_col].to_numpy()[rows]})
+        .drop_duplicates()
+        .groupby('segment', sort=True)['alarm']
+        .agg(list)
+    )
+
+    segments = pd.DataFrame({
+        'group': codes,
+        'start': pd.to_datetime(previous_ends),
+        'end': pd.to_datetime(clipped_ends),
+        'downtime': (clipped_ends - clipped_starts) / _NS_PER_MINUTE,
+        'active': (clipped_starts - previous_ends) / _NS_PER_MINUTE,
+        'first_tsactive': pd.to_datetime(merged_starts),
+        'alarms': alarm_lists.to_numpy(),
+    })
+
+    last_in_group = np.r_[new_group[1:], True]
+    open_tails = last_in_group & (clipped_ends < window_end)
+    tails = pd.DataFrame({
+        'group': codes[open_tails],
+        'start': pd.to_datetime(clipped_ends[open_tails]),
+        'end': pd.Timestamp(window_end),
+        'downtime': 0.0,
+        'active': (window_end - clipped_ends[open_tails]) / _NS_PER_MINUTE,
+        'first_tsactive': pd.NaT,
+        'alarms': [[] for _ in range(open_tails.sum())],
+    })
+
+    n_groups = len(categories)
+    totals = np.bincount(codes, weights=segments['downtime'].to_numpy(), minlength=n_groups)
+    present = np.bincount(codes, minlength=n_groups) > 0
+    segments = pd.concat([segments, tails], ignore_index=True)
+    plot_order = np.argsort(-totals, kind='stable')[::-1]
+    plot_order = plot_order[present[plot_order]]
+    rank = np.empty(n_groups, dtype=int)
+    rank[plot_order] = np.arange(len(plot_order))
+    segments['group'] = rank[segments['group'].to_numpy()]
+    segments = segments.sort_values(['group', 'start'], kind='stable', ignore_index=True)
+    segments['group'] = pd.Categorical.from_codes(segments['group'], categories[plot_order])
+    return segments[SEGMENT_COLUMNS]
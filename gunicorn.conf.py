@@ -0,0 +1,16 @@
+"""Gunicorn settings, read from the working directory by ``gunicorn app:server``.
+
+With ``preload_app`` the master imports the app once and forks the workers
+from it, so each worker is ready as soon as it is forked and the imported
+modules are shared copy-on-write. Importing the app starts no threads or
+processes: schedulers start on a worker's first request and process pools
+on first use, so nothing is forked half-initialized.
+"""
+import os
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8050')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,68 @@
+"""Check that importing the app stays within its startup budget.
+
+    python import_budget.py --budget-ms 600
+
+Imports ``--module`` in fresh interpreters under ``python -X importtime``,
+reports the slowest imports of the fastest run and exits with status 1
+when that run exceeds ``--budget-ms`` or loads a module that should only be
+imported by the feature that uses it. Run it in CI to catch startup
+regressions.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+# Imported lazily by the features that need them; importing the app must not load them.
+DEFERRED_MODULES = ['requests', 'matplotlib', 'seaborn', 'googleapiclient']
+
+# About 1.3x the measured import of the app (450-520 ms), so a regression fails rather than hides in the slack.
+BUDGET_MS = 600
+
+
+def import_times(module):
+    """``{name: (self_us, cumulative_us)}`` of every import made while importing ``module``."""
+    env = dict(os.environ, BACKGROUND_SCHEDULER='false')
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    parser.add_argument('--repeat', type=int, default=3, help='imports to run; the fastest one is checked')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to report')
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    times = min(runs, key=lambda run: run[args.module][1])
+    total_ms = times[args.module][1] / 1000
+
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, (self_us, cumulative_us) in sorted(times.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms cumulative {self_us / 1000:8.1f} ms self  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    for module in DEFERRED_MODULES:
+        if module in times:
+            failures.append(f"import {args.module} loaded {module}, which should be imported lazily")
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
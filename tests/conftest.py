@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from data import synthetic
+from data.equipment_groups import EquipmentGrouping
+from data.normalize import normalize_alarms
+
+
+GROUPING = {
+    'Press': ['HMI - PRESS ON HOLD'],
+    'Pumps': ['I100 - MAIN PUMP 2 - MPU', 'I102 - MAIN PUMP 1 - MPU'],
+    'Puller System': ['PULLER ENCODER COMS DOWN', 'PULLER DRIVE COMS DOWN', '9400 - PULLER DRIVE FAULT'],
+}
+
+
+@pytest.fixture
+def grouping():
+    return EquipmentGrouping(GROUPING)
+
+
+@pytest.fixture
+def alarms():
+    """Normalized synthetic alarm rows over ten days, sorted by ``tslast`` as the store keeps them."""
+    records = synthetic.alarm_records(5000, synthetic.alarm_names(GROUPING), start='2024-01-01', days=10)
+    return normalize_alarms(pd.DataFrame(records)).sort_values('tslast', kind='stable', ignore_index=True)
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from data.alarm_store import AlarmStore
+from data.snapshot import AlarmSnapshot
+
+
+ROWS = pd.DataFrame({
+    'tsactive': pd.to_datetime(['2024-01-01 06:58', '2024-01-01 07:05', '2024-01-01 07:15']),
+    'tslast': pd.to_datetime(['2024-01-01 07:00', '2024-01-01 07:10', '2024-01-01 07:20']),
+    'alarm': ['PRESS OVERLOAD', 'PUMP TRIP', 'PRESS OVERLOAD'],
+    'time_difference_minutes': [2.0, 5.0, 5.0],
+})
+
+
+class Source:
+    """Rows with ``tslast >= since``, like the Frappe and Sheets fetchers."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, since):
+        self.calls.append(since)
+        return self.rows if since is None else self.rows[self.rows['tslast'] >= since]
+
+
+def watch(store):
+    notifications = []
+    store.add_listener(lambda df, added: notifications.append(None if added is None else len(added)))
+    return notifications
+
+
+@pytest.fixture
+def stores(tmp_path):
+    source = Source(ROWS)
+    return source, [AlarmStore(source, refresh_interval=0, snapshot=AlarmSnapshot(str(tmp_path))) for _ in range(2)]
+
+
+def test_refresh_without_new_rows_keeps_the_snapshot_and_frame(stores):
+    source, (first, second) = stores
+    first.refresh(force=True)
+    second.refresh(force=True)
+    generation = first.snapshot.current_generation()
+    frames = first.get(), second.get()
+    notifications = [watch(first), watch(second)]
+
+    for _ in range(2):
+        first.refresh(force=True)
+        second.refresh(force=True)
+
+    assert first.snapshot.current_generation() == generation
+    assert (first.status()['snapshot_generation'], second.status()['snapshot_generation']) == (generation, generation)
+    assert first.get() is frames[0] and second.get() is frames[1]
+    assert notifications == [[], []]
+    assert source.calls[-1] == ROWS['tslast'].iloc[-1]
+
+
+def test_new_rows_are_passed_to_the_other_worker_by_snapshot(stores):
+    source, (first, second) = stores
+    first.refresh(force=True)
+    second.refresh(force=True)
+    generation = first.snapshot.current_generation()
+    notifications = [watch(first), watch(second)]
+
+    source.rows = pd.concat([ROWS, pd.DataFrame({
+        'tsactive': [pd.Timestamp('2024-01-01 07:25')], 'tslast': [pd.Timestamp('2024-01-01 07:30')],
+        'alarm': ['PUMP TRIP'], 'time_difference_minutes': [5.0],
+    })], ignore_index=True)
+    first.refresh(force=True)
+    second.refresh(force=True)
+
+    assert first.snapshot.current_generation() == generation + 1
+    assert len(second.get()) == 4
+    assert notifications == [[1], [None]]
+
+
+def test_first_load_fetches_only_the_retention_window():
+    source = Source(ROWS)
+    store = AlarmStore(source, retention=pd.Timedelta(days=2))
+    before = pd.Timestamp.now()
+    store.refresh(force=True)
+    since = source.calls[0]
+    assert before - pd.Timedelta(days=2) <= since <= pd.Timestamp.now() - pd.Timedelta(days=2)
+
+    unbounded = Source(ROWS)
+    AlarmStore(unbounded).refresh(force=True)
+    assert unbounded.calls == [None]
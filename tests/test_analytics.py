@@ -0,0 +1,90 @@
+import math
+
+import pandas as pd
+import pytest
+
+from data.alarm_store import AlarmStore
+from data.analytics import AlarmAnalytics, chattering, frequency, pareto, reliability
+from data.equipment_groups import EquipmentGrouping
+
+
+FANS = [f'FAN {number} OVERTEMP' for number in range(11)]
+GROUPING = {'Cooling Fans': FANS, 'Pumps': ['PUMP TRIP']}
+START, END = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02')
+
+
+def rows(*alarms):
+    """Rows of ``(alarm, tsactive, tslast)``."""
+    frame = pd.DataFrame(alarms, columns=['alarm', 'tsactive', 'tslast'])
+    frame['tsactive'] = pd.to_datetime(frame['tsactive'])
+    frame['tslast'] = pd.to_datetime(frame['tslast'])
+    frame['time_difference_minutes'] = (frame['tslast'] - frame['tsactive']).dt.total_seconds() / 60
+    return frame.sort_values('tslast', kind='stable', ignore_index=True)
+
+
+@pytest.fixture
+def df():
+    grouping = EquipmentGrouping(GROUPING)
+    frame = rows(
+        # Every fan trips at once when the cooling water fails.
+        *[(fan, '2024-01-01 08:00:00', '2024-01-01 08:30:00') for fan in FANS],
+        # The same activation of FAN 0 fetched again with a later tslast.
+        ('FAN 0 OVERTEMP', '2024-01-01 08:00:00', '2024-01-01 08:40:00'),
+        # The pump chatters: three activations within a minute.
+        ('PUMP TRIP', '2024-01-01 10:00:00', '2024-01-01 10:00:10'),
+        ('PUMP TRIP', '2024-01-01 10:00:20', '2024-01-01 10:00:30'),
+        ('PUMP TRIP', '2024-01-01 10:00:40', '2024-01-01 10:00:50'),
+    )
+    frame['Equipment Group'] = grouping.classify(frame['alarm'])
+    return frame
+
+
+def by_group(frame, column):
+    return dict(zip(frame['group'], frame[column]))
+
+
+def test_reliability_counts_each_alarm_that_starts_together(df):
+    result = reliability(df, START, END, 'Equipment Group')
+    assert by_group(result, 'alarms') == {'Cooling Fans': 11, 'Pumps': 3}
+    assert by_group(result, 'failures') == {'Cooling Fans': 1, 'Pumps': 3}
+    assert by_group(result, 'downtime_minutes')['Cooling Fans'] == pytest.approx(40)
+    assert by_group(result, 'mttr_minutes')['Pumps'] == pytest.approx(10 / 60)
+    assert reliability(df, START, END, 'alarm')['alarms'].sum() == 14
+
+
+def test_pareto_by_count_and_downtime(df):
+    counts = pareto(df, START, END, 'Equipment Group', metric='count')
+    assert by_group(counts, 'count') == {'Cooling Fans': 11, 'Pumps': 3}
+    assert counts['cumulative_share'].iloc[-1] == pytest.approx(1)
+    downtime = pareto(df, START, END, 'Equipment Group', metric='downtime', top=1)
+    assert downtime['group'].tolist() == ['Cooling Fans']
+    assert downtime['vital_few'].tolist() == [True]
+    with pytest.raises(ValueError):
+        pareto(df, START, END, 'Equipment Group', metric='rows')
+
+
+def test_frequency_per_hour(df):
+    result = frequency(df, START, END, 'Equipment Group', period='hour')
+    assert result.to_dict('records') == [
+        {'period': pd.Timestamp('2024-01-01 08:00'), 'group': 'Cooling Fans', 'alarms': 11},
+        {'period': pd.Timestamp('2024-01-01 10:00'), 'group': 'Pumps', 'alarms': 3},
+    ]
+
+
+def test_chattering(df):
+    result = chattering(df, START, END, 'Equipment Group', window_seconds=60, min_activations=3)
+    # The fans start together, so their activations form bursts too.
+    assert by_group(result, 'bursts') == {'Cooling Fans': 9, 'Pumps': 1}
+    assert by_group(result, 'min_gap_seconds')['Pumps'] == 20
+    assert chattering(df, START, END, 'alarm', window_seconds=60)['group'].tolist() == ['PUMP TRIP']
+    for window_seconds in (math.inf, math.nan, 0):
+        with pytest.raises(ValueError):
+            chattering(df, START, END, 'Equipment Group', window_seconds=window_seconds)
+
+
+def test_query_rejects_time_zones(df):
+    store = AlarmStore(lambda since: df.drop(columns='Equipment Group'))
+    analytics = AlarmAnalytics(store, EquipmentGrouping(GROUPING))
+    assert len(analytics.query('reliability', START, END)) == 2
+    with pytest.raises(ValueError):
+        analytics.query('reliability', '2024-01-01T00:00Z', END)
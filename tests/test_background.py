@@ -0,0 +1,72 @@
+import threading
+import time
+
+from data.background import BackgroundJobs
+
+
+def slow_build(seconds, calls):
+    def build():
+        calls.append(1)
+        time.sleep(seconds)
+        return 'figure'
+    return build
+
+
+def poll(jobs, build, wait, client='client', attempts=50):
+    for _ in range(attempts):
+        done, result = jobs.wait('view', build, client=client, timeout=wait)
+        if done:
+            return result
+        time.sleep(0.05)
+    return None
+
+
+def test_build_slower_than_wait_is_collected_by_a_later_poll():
+    jobs = BackgroundJobs(max_workers=2)
+    calls = []
+    assert poll(jobs, slow_build(0.4, calls), wait=0.1) == 'figure'
+    assert len(calls) == 1
+
+
+def test_zero_wait_still_delivers_the_result():
+    jobs = BackgroundJobs(max_workers=2)
+    calls = []
+    assert poll(jobs, slow_build(0.2, calls), wait=0) == 'figure'
+    assert len(calls) == 1
+
+
+def test_concurrent_clients_share_one_build():
+    jobs = BackgroundJobs(max_workers=2)
+    calls = []
+    build = slow_build(0.3, calls)
+    results = []
+    threads = [threading.Thread(target=lambda client=client: results.append(poll(jobs, build, 0.05, client)))
+               for client in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['figure'] * 5
+    assert len(calls) == 1
+
+
+def test_finished_results_expire():
+    jobs = BackgroundJobs(max_workers=1, result_seconds=0.1)
+    calls = []
+    build = slow_build(0, calls)
+    assert poll(jobs, build, wait=1) == 'figure'
+    time.sleep(0.2)
+    assert poll(jobs, build, wait=1) == 'figure'
+    assert len(calls) == 2
+
+
+def test_switching_views_cancels_a_queued_build():
+    jobs = BackgroundJobs(max_workers=1)
+    blocker = threading.Event()
+    jobs.submit('busy', blocker.wait, client='other')
+    calls = []
+    jobs.submit('view', slow_build(0, calls), client='client')
+    jobs.submit('another view', lambda: 'other figure', client='client')
+    blocker.set()
+    assert jobs.wait('another view', lambda: 'other figure', client='client', timeout=1) == (True, 'other figure')
+    assert calls == []
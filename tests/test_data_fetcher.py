@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+from data.data_fetcher import SheetsClient, rows_to_frame
+
+
+SUMMARY = [['Alarm', 'Count'], ['PRESS OVERLOAD', '3']]
+HEADER = ['TSLast', 'TSActive', 'Unit Alarm Occurance', 'Operator']
+DATA_SOURCE = [
+    HEADER,
+    ['2024-01-01 07:00:00', '2024-01-01 06:58:00', 'PRESS OVERLOAD', 'Ann'],
+    # A short row, as the API returns when the trailing cells are empty.
+    ['2024-01-01 07:10:00', '2024-01-01 07:05:00', 'PUMP TRIP'],
+]
+
+
+class FakeSheet:
+    """``spreadsheets().values().batchGet(...).execute()`` over an in-memory sheet, recording each call."""
+
+    def __init__(self, values):
+        self.values_by_range = values
+        self.calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension):
+        self.calls.append({'spreadsheetId': spreadsheetId, 'ranges': ranges, 'majorDimension': majorDimension})
+        self._ranges = ranges
+        return self
+
+    def execute(self):
+        return {'valueRanges': [{'range': name, **({'values': self.values_by_range[name]}
+                                                   if name in self.values_by_range else {})}
+                                for name in self._ranges]}
+
+
+@pytest.fixture
+def sheet():
+    return FakeSheet({'Alarm Summary': SUMMARY, 'Data Source': DATA_SOURCE})
+
+
+def test_first_read_gets_both_ranges_in_one_call(sheet):
+    client = SheetsClient('sheet-id', service=sheet)
+    df = client.read()
+
+    assert sheet.calls == [{'spreadsheetId': 'sheet-id', 'ranges': ['Alarm Summary', 'Data Source'],
+                            'majorDimension': 'ROWS'}]
+    assert client.alarm_summary.to_dict('records') == [{'Alarm': 'PRESS OVERLOAD', 'Count': '3'}]
+    assert list(df.columns) == ['TSLast', 'TSActive', 'Unit Alarm Occurance', 'Time_Difference_minutes']
+    assert df['Unit Alarm Occurance'].tolist() == ['PRESS OVERLOAD', 'PUMP TRIP']
+    assert df['TSLast'].tolist() == [pd.Timestamp('2024-01-01 07:00'), pd.Timestamp('2024-01-01 07:10')]
+    assert df['Time_Difference_minutes'].tolist() == [2.0, 5.0]
+    assert client.rows_read == 2
+
+
+def test_short_rows_are_padded_and_long_rows_cut():
+    frame = rows_to_frame(DATA_SOURCE[1:] + [['2024-01-01 07:30:00', '', 'PUMP TRIP', 'Bo', 'extra']], HEADER)
+    assert list(frame.columns) == HEADER
+    assert pd.isna(frame.loc[1, 'Operator'])
+    assert frame.loc[2, 'Operator'] == 'Bo'
+
+
+def test_incremental_reads_ask_only_for_new_rows(sheet):
+    client = SheetsClient('sheet-id', service=sheet)
+    client.read()
+
+    sheet.values_by_range["'Data Source'!1:1"] = [HEADER]
+    sheet.values_by_range["'Data Source'!A4:ZZ"] = [['2024-01-01 07:20:00', '2024-01-01 07:19:00', 'PULLER JAM']]
+    df = client.read(incremental=True)
+    assert sheet.calls[-1]['ranges'] == ["'Data Source'!1:1", "'Data Source'!A4:ZZ"]
+    assert df['Unit Alarm Occurance'].tolist() == ['PULLER JAM']
+    assert client.rows_read == 3
+
+    # Nothing appended: the next read starts one row further down and returns no rows.
+    df = client.read(incremental=True)
+    assert sheet.calls[-1]['ranges'] == ["'Data Source'!1:1", "'Data Source'!A5:ZZ"]
+    assert df.empty
+    assert client.rows_read == 3
+    assert len(sheet.calls) == 3
+
+
+def test_fetch_maps_columns_for_the_store(sheet):
+    client = SheetsClient('sheet-id', service=sheet)
+    df = client.fetch()
+    assert {'tslast', 'tsactive', 'alarm', 'time_difference_minutes'} <= set(df.columns)
+    assert client.fetch(since=df['tslast'].max()).empty
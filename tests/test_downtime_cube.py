@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from data.downtime_cube import DowntimeCube
+from data.timeline import interval_timeline
+from data.normalize import overlapping_rows
+
+
+def timeline_downtime(df, grouping, start, end):
+    window = overlapping_rows(df, start, end).copy()
+    window['Equipment Group'] = grouping.classify(window['alarm'])
+    segments = interval_timeline(window, start, end, 'Equipment Group')
+    return segments.groupby('group', observed=True)['downtime'].sum().rename(str)
+
+
+def test_daily_shift_totals_match_the_timeline(alarms, grouping):
+    cube = DowntimeCube(grouping, alarms)
+    totals = cube.totals('2024-01-02', '2024-01-09', shift_start=7, shift_end=17)
+    for day in pd.date_range('2024-01-02', '2024-01-08'):
+        expected = timeline_downtime(alarms, grouping, day + pd.Timedelta(hours=7), day + pd.Timedelta(hours=17))
+        actual = totals[totals['period'] == day].set_index('Equipment Group')['downtime_minutes']
+        expected = expected[expected > 0]
+        assert sorted(actual.index) == sorted(expected.index)
+        np.testing.assert_allclose(actual[expected.index].to_numpy(), expected.to_numpy())
+
+
+def test_downtime_never_exceeds_the_hour(alarms, grouping):
+    downtime = DowntimeCube(grouping, alarms).downtime('2024-01-01', '2024-01-11')
+    assert (downtime['downtime_minutes'] <= 60 + 1e-9).all()
+
+
+def test_updates_match_a_rebuild(alarms, grouping):
+    cube = DowntimeCube(grouping)
+    cut = [0, 1000, 1001, 3500, len(alarms)]
+    for lo, hi in zip(cut[:-1], cut[1:]):
+        seen = alarms.iloc[:hi].reset_index(drop=True)
+        if lo == 0:
+            cube.rebuild(seen)
+        else:
+            cube.on_store_change(seen, alarms.iloc[lo:hi].reset_index(drop=True))
+    rebuilt = DowntimeCube(grouping, alarms)
+    for period in ('day', 'week'):
+        pd.testing.assert_frame_equal(cube.totals('2024-01-01', '2024-01-11', period=period),
+                                      rebuilt.totals('2024-01-01', '2024-01-11', period=period))
+
+
+def test_alarm_counts_are_kept_per_alarm(alarms, grouping):
+    cube = DowntimeCube(grouping, alarms)
+    totals = cube.totals('2024-01-01', '2024-01-11', by=['Equipment Group'])
+    assert totals['alarm_count'].sum() == len(alarms)
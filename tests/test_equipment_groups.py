@@ -0,0 +1,45 @@
+import pandas as pd
+
+from data.equipment_groups import UNKNOWN_GROUP, EquipmentGrouping
+
+
+GROUPING = {'Press': ['PRESS OVERLOAD'], 'Pumps': ['PUMP TRIP']}
+
+
+def frame(*alarms):
+    return pd.DataFrame({'alarm': pd.Categorical(alarms)})
+
+
+def test_classify_does_not_count():
+    grouping = EquipmentGrouping(GROUPING)
+    groups = grouping.classify(pd.Series(['PRESS OVERLOAD', 'NEW ALARM']))
+    assert groups.tolist() == ['Press', UNKNOWN_GROUP]
+    grouping.classify(pd.Series(['NEW ALARM']))
+    assert grouping.unknown_alarms == {}
+
+
+def test_unknown_alarms_are_counted_once_per_refresh():
+    grouping = EquipmentGrouping(GROUPING)
+    df = frame('PRESS OVERLOAD', 'NEW ALARM', 'NEW ALARM')
+    grouping.on_store_change(df, None)
+    assert grouping.unknown_alarms == {'NEW ALARM': 2}
+
+    added = frame('NEW ALARM', 'OTHER ALARM', 'PUMP TRIP')
+    grouping.on_store_change(pd.concat([df, added], ignore_index=True), added)
+    assert grouping.unknown_alarms == {'NEW ALARM': 3, 'OTHER ALARM': 1}
+
+    # A replaced frame starts the counts over.
+    grouping.on_store_change(frame('OTHER ALARM'), None)
+    assert grouping.unknown_alarms == {'OTHER ALARM': 1}
+
+
+def test_reloaded_grouping_recounts_the_store(tmp_path):
+    path = tmp_path / 'grouping.json'
+    path.write_text('{"Press": ["PRESS OVERLOAD"]}')
+    grouping = EquipmentGrouping(GROUPING, path=str(path))
+    grouping.on_store_change(frame('PRESS OVERLOAD', 'PUMP TRIP'), None)
+    assert grouping.unknown_alarms == {'PUMP TRIP': 1}
+
+    path.write_text('{"Press": ["PRESS OVERLOAD"], "Pumps": ["PUMP TRIP"]}')
+    grouping.reload_if_changed(force=True)
+    assert grouping.unknown_alarms == {}
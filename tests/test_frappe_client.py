@@ -0,0 +1,93 @@
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from data.frappe_client import FrappeClient
+
+
+# Ten rows; the first six share one tslast, like a burst of alarms from one stop.
+ROWS = [
+    {'name': f'ALM-{number:03d}', 'tsactive': '2024-01-01 06:59:00', 'tslast': tslast, 'alarm': f'ALARM {number}',
+     'time_difference_minutes': 1.0}
+    for number, tslast in enumerate(['2024-01-01 07:00:00'] * 6 + ['2024-01-01 07:05:00', '2024-01-01 07:10:00',
+                                                                   '2024-01-01 07:10:00', '2024-01-01 07:20:00'])
+]
+
+
+class FrappeStub(BaseHTTPRequestHandler):
+    """``/api/resource/Alarm`` with Frappe's filters, ordering and offset paging.
+
+    Like a database without a unique sort key, rows tied on the sort columns
+    come back in a different order on every request.
+    """
+
+    requests = []
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        self.requests.append(query)
+        rows = list(ROWS)
+        for field, operator, value in json.loads(query.get('filters', '[]')):
+            compare = {'>=': lambda a, b: a >= b, '<': lambda a, b: a < b}[operator]
+            rows = [row for row in rows if compare(pd.Timestamp(row[field]), pd.Timestamp(value))]
+        keys = [clause.split()[0] for clause in query['order_by'].split(',')]
+        random.shuffle(rows)
+        rows.sort(key=lambda row: tuple(row[key] for key in keys))
+        start = int(query['limit_start'])
+        page = rows[start:start + int(query['limit_page_length'])]
+        fields = json.loads(query['fields'])
+        body = json.dumps({'data': [{field: row[field] for field in fields} for row in page]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_url():
+    FrappeStub.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FrappeStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/api/resource/Alarm'
+    server.shutdown()
+    server.server_close()
+
+
+def test_pages_return_every_row_once(api_url):
+    for _ in range(5):
+        df = FrappeClient(api_url, token='key:secret', page_length=4).fetch()
+        assert sorted(df['alarm']) == sorted(row['alarm'] for row in ROWS)
+    assert [int(query['limit_start']) for query in FrappeStub.requests[:3]] == [0, 4, 8]
+    assert all(query['order_by'] == 'tslast asc, name asc' for query in FrappeStub.requests)
+
+
+def test_last_full_page_is_followed_by_an_empty_one(api_url):
+    df = FrappeClient(api_url, page_length=5).fetch()
+    assert len(df) == len(ROWS)
+    assert [int(query['limit_start']) for query in FrappeStub.requests] == [0, 5, 10]
+
+
+def test_since_is_inclusive_and_until_exclusive(api_url):
+    client = FrappeClient(api_url, page_length=2)
+    df = client.fetch(since=pd.Timestamp('2024-01-01 07:10:00'), until=pd.Timestamp('2024-01-01 07:20:00'))
+    assert sorted(df['alarm']) == ['ALARM 7', 'ALARM 8']
+    assert json.loads(FrappeStub.requests[0]['filters']) == [
+        ['tslast', '>=', '2024-01-01 07:10:00.000000'], ['tslast', '<', '2024-01-01 07:20:00.000000']]
+
+
+def test_incremental_fetch_from_the_high_water_mark(api_url):
+    client = FrappeClient(api_url, page_length=3)
+    high_water_mark = client.fetch()['tslast'].max()
+    df = client.fetch(since=high_water_mark)
+    assert list(df['alarm']) == ['ALARM 9']
+    assert df['tslast'].dtype.kind == 'M'
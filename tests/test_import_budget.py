@@ -0,0 +1,8 @@
+import import_budget
+
+
+def test_importing_the_app_defers_heavy_modules_and_stays_within_budget():
+    runs = [import_budget.import_times('app') for _ in range(3)]
+    times = min(runs, key=lambda run: run['app'][1])
+    assert [module for module in import_budget.DEFERRED_MODULES if module in times] == []
+    assert times['app'][1] / 1000 <= import_budget.BUDGET_MS
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from data.live import LiveTimeline
+from data.normalize import overlapping_rows
+from data.timeline import interval_timeline
+
+
+START, END = pd.Timestamp('2024-01-03 07:00'), pd.Timestamp('2024-01-03 17:00')
+
+
+def coverage(pieces):
+    """Pieces merged into sorted disjoint intervals per group."""
+    merged = {}
+    for group, start, end, _ in sorted(pieces, key=lambda piece: (piece[0], piece[1])):
+        intervals = merged.setdefault(group, [])
+        if intervals and start <= intervals[-1][1]:
+            intervals[-1][1] = max(intervals[-1][1], end)
+        else:
+            intervals.append([start, end])
+    return merged
+
+
+@pytest.fixture
+def window(alarms):
+    return overlapping_rows(alarms, START, END).reset_index(drop=True)
+
+
+def test_downtime_matches_the_timeline(window, grouping):
+    timeline = LiveTimeline(START, END, grouping.classify, window)
+    rows = window.assign(**{'Equipment Group': grouping.classify(window['alarm'])})
+    segments = interval_timeline(rows, START, END, 'Equipment Group')
+    expected = segments.groupby('group', observed=True)['downtime'].sum()
+    actual = timeline.downtime_minutes()
+    for group, minutes in expected.items():
+        assert actual.get(str(group), 0) == pytest.approx(minutes)
+
+
+def test_workers_with_the_same_rows_agree_on_marks_and_deltas(window, grouping):
+    cut = len(window) // 2
+    incremental = LiveTimeline(START, END, grouping.classify, window.iloc[:cut])
+    client_mark, client_rows = incremental.state()
+    incremental.apply(window.iloc[cut:])
+    rebuilt = LiveTimeline(START, END, grouping.classify, window)
+
+    assert incremental.state() == rebuilt.state()
+    assert rebuilt.rows_through(client_mark) == client_rows
+    drawn, _ = incremental.pieces(through=client_mark)
+    for worker in (incremental, rebuilt):
+        delta, _ = worker.pieces(after=client_mark)
+        assert coverage(drawn + delta) == coverage(rebuilt.pieces()[0])
+        assert coverage(delta) == coverage(incremental.pieces(after=client_mark)[0])
+
+
+def test_a_late_row_at_the_mark_changes_the_row_count(window, grouping):
+    timeline = LiveTimeline(START, END, grouping.classify, window)
+    mark, rows = timeline.state()
+    late = window.iloc[[0]].assign(tslast=pd.Timestamp(mark), tsactive=pd.Timestamp(mark) - pd.Timedelta(minutes=5))
+    timeline.apply(late)
+    assert timeline.rows_through(mark) == rows + 1
+
+
+def test_new_groups_are_reported_once(window, grouping):
+    timeline = LiveTimeline(START, END, grouping.classify, window)
+    pieces, groups = timeline.pieces()
+    assert sorted(groups) == sorted({piece[0] for piece in pieces})
+    mark, _ = timeline.state()
+    assert timeline.pieces(after=mark) == ([], [])
@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from data.normalize import max_duration, overlapping_rows
+
+
+@pytest.mark.parametrize('start, end', [
+    ('2024-01-01', '2024-01-11'),
+    ('2024-01-03 06:00', '2024-01-03 07:00'),
+    ('2024-01-05 12:30', '2024-01-06 00:00'),
+    ('2023-12-01', '2023-12-02'),
+])
+def test_bounded_overlapping_rows_match_unbounded(alarms, start, end):
+    bounded = overlapping_rows(alarms, start, end, max_duration=max_duration(alarms))
+    pd.testing.assert_frame_equal(bounded, overlapping_rows(alarms, start, end))
+
+
+def test_max_duration_treats_missing_start_as_end(alarms):
+    rows = alarms.head(3).copy()
+    rows['tsactive'] = [rows['tslast'].iloc[0] - pd.Timedelta(minutes=5), pd.NaT, rows['tslast'].iloc[2]]
+    assert max_duration(rows) == pd.Timedelta(minutes=5)
+    assert max_duration(rows.iloc[:0]) == pd.Timedelta(0)
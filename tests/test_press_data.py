@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+
+from data.press_data import convert_trend_chunk
+
+
+def test_convert_trend_chunk():
+    chunk = pd.DataFrame({'TS': [1704092400123456, 1704092401999999], 'Val1': [2500000, None],
+                          'Val2': [1e6, 3e6], 'Val3': [None, 4500000]})
+    converted = convert_trend_chunk(chunk)
+    assert converted['Timestamp'].tolist() == [pd.Timestamp('2024-01-01 07:00:00'), pd.Timestamp('2024-01-01 07:00:01')]
+    np.testing.assert_array_equal(converted['Extrusion Time'], [2.5, 0.0])
+    np.testing.assert_array_equal(converted['Dead Cycle Time'], [1.0, 3.0])
+    np.testing.assert_array_equal(converted['Full Cycle Time'], [0.0, 4.5])
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.thermocouple_heatmaps import ThermocoupleRollup, heatmap_table
+
+
+@pytest.fixture
+def rollup():
+    index = pd.date_range('2024-01-01', '2024-01-03 23:50', freq='10min', name='Version')
+    return ThermocoupleRollup(pd.DataFrame({'TC1': np.arange(len(index), dtype='float64')}, index=index))
+
+
+def test_end_date_ends_at_midnight(rollup):
+    hourly = rollup.hourly('2024-01-01', '2024-01-02', columns=['TC1'])
+    assert hourly.index.min() == pd.Timestamp('2024-01-01 00:00')
+    assert hourly.index.max() == pd.Timestamp('2024-01-02 00:00')
+    assert list(heatmap_table(rollup, '2024-01-01', '2024-01-02', 'TC1').index) == [pd.Timestamp('2024-01-01').date()]
+
+
+def test_unknown_thermocouple_or_empty_rollup_has_no_data(rollup):
+    assert rollup.hourly('2024-01-01', '2024-01-02', columns=['TC9']).empty
+    assert heatmap_table(rollup, '2024-01-01', '2024-01-02', 'TC9') is None
+    assert heatmap_table(ThermocoupleRollup(), '2024-01-01', '2024-01-02', 'TC1') is None